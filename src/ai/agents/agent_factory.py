@@ -14,7 +14,7 @@ class AgentFactory:
         agent_type = agent_type.strip()
 
         if agent_type == AgentType.NEATAgent.value:
-            return NeatAgent(brain)
+            return NeatAgent(brain, **kwargs)
 
         if agent_type == AgentType.MinimaxAgent.value:
             return MinimaxAgent(brain, **kwargs)
@@ -1,7 +1,7 @@
 # ai/agents/basic_agent.py
 from typing import Any, Optional
 
-from utils.helpers import manhattan, next_step_toward_snapshot
+from utils.helpers import next_step_toward_snapshot
 
 from .base_agent import BaseAgent
 
@@ -17,40 +17,42 @@ class BasicAgent(BaseAgent):
         board_snapshot: dict returned by GameState.get_snapshot()
         team: team_id (1 or 2)
         """
-        units = board_snapshot["units"]
+        team = int(team)
 
+        # One pass: first ally that can still act, all living enemies, and
+        # the occupied tiles for pathfinding.
         # Use team_id, not TeamType, to distinguish sides
-        my_units = [
-            u
-            for u in units
-            if int(u["team_id"]) == int(team)
-            and not u["has_acted"]
-            and u["move_points"] > 0
-        ]
-
-        enemy_units = [
-            u for u in units if int(u["team_id"]) != int(team) and u["health"] > 0
-        ]
-
-        if not my_units or not enemy_units:
+        unit = None
+        enemy_units = []
+        occupied = set()
+        for u in board_snapshot["units"]:
+            occupied.add((u["x"], u["y"]))
+            if u["team_id"] == team:
+                if unit is None and not u["has_acted"] and u["move_points"] > 0:
+                    unit = u
+            elif u["health"] > 0:
+                enemy_units.append(u)
+
+        if unit is None or not enemy_units:
             return None
 
-        unit = my_units[0]
+        ux, uy = unit["x"], unit["y"]
+
         # pick nearest by manhattan for attack check, but movement uses path
-        target = min(
-            enemy_units, key=lambda e: manhattan(unit["x"], unit["y"], e["x"], e["y"])
-        )
+        target = None
+        best_dist = None
+        for e in enemy_units:
+            d = abs(ux - e["x"]) + abs(uy - e["y"])
+            if best_dist is None or d < best_dist:
+                target, best_dist = e, d
 
         # if in attack range (tile distance) -> attack
-        if (
-            manhattan(unit["x"], unit["y"], target["x"], target["y"])
-            <= unit["attack_range"]
-        ):
+        if best_dist <= unit["attack_range"]:
             return {"unit_id": unit["id"], "type": "attack", "target": target["id"]}
 
         # otherwise compute next step along shortest-cost path and move there
         nxt = next_step_toward_snapshot(
-            board_snapshot, (unit["x"], unit["y"]), (target["x"], target["y"])
+            board_snapshot, (ux, uy), (target["x"], target["y"]), occupied
         )
         if nxt is None:
             return None
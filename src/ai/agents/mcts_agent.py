@@ -5,9 +5,11 @@ import random
 import time
 from dataclasses import dataclass
 
+import numpy as np
+
 from ai.neat.neat_network import NeatNetwork
 from ai.planning.action_planning import ActionPlannerReversible
-from ai.utils.nn_utils import encode_state, encode_state_old
+from ai.utils.nn_utils import encode_state, encode_state_old, encode_state_old_batch
 from api.simulation_api import SimulationAPI
 from utils.logging import logger
 
@@ -51,6 +53,8 @@ class MCTSAgent:
         c_puct: float = 1.4,  # exploration constant
     ) -> None:
         self.brain = brain
+        # Feature buffer reused by every _eval_snapshot call (encode_state_old)
+        self._features = np.empty(40, dtype=np.float32)
 
         self.planner = ActionPlannerReversible(
             dfs_action_sets_limit=dfs_action_sets_limit,
@@ -75,9 +79,14 @@ class MCTSAgent:
     # NEAT evaluation
     # ----------------------------------------------------------------------
     def _eval_snapshot(self, snapshot: dict, team_id: int) -> float:
-        state = encode_state_old(snapshot, team_id)
+        state = encode_state_old(snapshot, team_id, out=self._features)
         return float(self.brain.predict(state)[0])
 
+    def _eval_snapshots(self, snapshots: list[dict], team_id: int) -> np.ndarray:
+        """Score many snapshots with a single batched forward pass."""
+        states = encode_state_old_batch(snapshots, team_id)
+        return self.brain.predict_batch(states)[:, 0]
+
     # ----------------------------------------------------------------------
     # Root move generation & pruning
     # ----------------------------------------------------------------------
@@ -93,37 +102,25 @@ class MCTSAgent:
         logger.info("[MCTSAgent] Generating root sequences for MCTS...")
 
         t0 = time.time()
-        all_sequences = self.planner.plan_sequences(game_board, team_id)
+        leaves = self.planner.plan_sequences(
+            game_board, team_id, with_snapshots=True, unique=True
+        )
         dt = time.time() - t0
 
         logger.info(
-            f"[MCTSAgent] DFS generated {len(all_sequences)} sequences "
+            f"[MCTSAgent] DFS generated {len(leaves)} sequences "
             f"for team {team_id} in {dt:.3f}s"
         )
 
-        if not all_sequences:
+        if not leaves:
             return []
 
-        # Quick score for pruning: simulate once per sequence from the ROOT board
-        # and evaluate with NN.
+        # Quick score for pruning: the DFS already reached every sequence's end
+        # state, so evaluate those snapshots with one batched NN call.
+        values = self._eval_snapshots([snap for _seq, snap in leaves], team_id)
         scored: list[tuple[list[dict], float]] = []
-
-        sim_root = SimulationAPI(game_board.fast_clone())
-        sim_root.start_turn(team_id)
-
-        for idx, seq in enumerate(all_sequences):
-            replay = sim_root.clone()
-            # It's our turn
-            # (start_turn already called on sim_root; clone should preserve state)
-            # but to be safe, ensure turn:
-            replay.start_turn(team_id)
-
-            for act in seq:
-                replay.apply_action(act)
-
-            val = self._eval_snapshot(replay.get_board_snapshot(), team_id)
+        for idx, ((seq, _snap), val) in enumerate(zip(leaves, values.tolist())):
             scored.append((seq, val))
-
             logger.debug(
                 f"[MCTSAgent] Root seq #{idx} len={len(seq)} quick_eval={val:.4f}"
             )
@@ -4,12 +4,29 @@ import time
 from math import inf
 from typing import Any
 
+import numpy as np
+
 from ai.neat.neat_network import NeatNetwork
 from ai.planning.action_planning import ActionPlannerReversible
 from ai.utils.nn_utils import encode_state, encode_state_old
 from api.simulation_api import SimulationAPI
 from utils.logging import logger
 
+# Transposition table bound flags: the stored value is exact, a lower bound
+# (search failed high) or an upper bound (search failed low).
+_EXACT, _LOWER, _UPPER = 0, 1, 2
+
+
+def _position_key(sim) -> tuple:
+    """
+    Exact, hashable key of the unit state; the map does not change during a
+    search, so this identifies the position.
+    """
+    return tuple(
+        (u.id, u.x, u.y, u.health, u.move_points, u.has_attacked, u.has_acted)
+        for u in sim.game_board.units
+    )
+
 
 class MinimaxAgent:
     """
@@ -20,6 +37,9 @@ class MinimaxAgent:
     - Uses ActionPlannerReversible to generate full-turn sequences.
     - Uses a per-team sequence cache so DFS is done ONCE per team per turn.
       All deeper minimax nodes reuse those sequences, only re-simulating them.
+    - Caches evaluations and alpha-beta results per position for the current
+      move, so leaves scored during child ordering and transposed positions
+      are not searched or evaluated again.
     """
 
     def __init__(
@@ -29,9 +49,14 @@ class MinimaxAgent:
         dfs_action_sets_limit: int = 800,
         dfs_branching_limit: int = 12,
         child_limit: int = 3,
+        aspiration_window: float | None = None,
     ) -> None:
         self.depth = depth
         self.child_limit = child_limit
+        # Half-width of the window each deepening pass searches around the
+        # previous pass's best score (re-searched in full on failure). None
+        # searches every pass with a full window.
+        self.aspiration_window = aspiration_window
 
         # Planner generates full-turn sequences with reversible DFS
         self.planner = ActionPlannerReversible(
@@ -41,11 +66,19 @@ class MinimaxAgent:
         )
 
         self.brain = brain
+        # Feature buffer reused by every _eval_snapshot call (encode_state_old)
+        self._features = np.empty(40, dtype=np.float32)
 
         # ✅ Cache of sequences per team_id for the current move
         #    { team_id: list[list[action_dict]] }
         self._sequence_cache: dict[int, list[list[dict]]] = {}
 
+        # Per-move caches keyed by _position_key():
+        #   position -> NN score for the searching team
+        #   (position, is_max) -> (depth, value, bound flag)
+        self._eval_cache: dict[tuple, float] = {}
+        self._tt: dict[tuple, tuple[int, float, int]] = {}
+
         logger.info(
             f"[MinimaxAgent] Initialized (depth={depth}, "
             f"""dfs_action_sets_limit={dfs_action_sets_limit},
@@ -58,9 +91,19 @@ class MinimaxAgent:
     # ----------------------------------------------------------------------
     def _eval_snapshot(self, snapshot: dict, team_id: int) -> float:
         """Evaluate board snapshot with NEAT brain for given team_id."""
-        state = encode_state_old(snapshot, team_id)
+        state = encode_state_old(snapshot, team_id, out=self._features)
         return float(self.brain.predict(state)[0])
 
+    def _eval_sim(self, sim, team_id: int, key: tuple | None = None) -> float:
+        """_eval_snapshot() of the sim's board, cached per position."""
+        if key is None:
+            key = _position_key(sim)
+        score = self._eval_cache.get(key)
+        if score is None:
+            score = self._eval_snapshot(sim.get_board_snapshot(), team_id)
+            self._eval_cache[key] = score
+        return score
+
     # ----------------------------------------------------------------------
     # Cached sequence retrieval
     # ----------------------------------------------------------------------
@@ -85,6 +128,7 @@ class MinimaxAgent:
             game_board=sim.game_board,
             team_id=team_id,
             # eval_fn=lambda snap: self._eval_snapshot(snap, team_id),
+            unique=True,
         )
 
         self._sequence_cache[team_id] = sequences
@@ -111,7 +155,10 @@ class MinimaxAgent:
                - simulate it once from the current sim
                - evaluate the resulting state with NN
                - keep the resulting SimulationAPI
-          3. Sort by score and keep top `child_limit`.
+          3. Sort best-first for the acting team and keep top `child_limit`.
+             Scores are from `eval_team`'s point of view, so the opponent's
+             best replies are the lowest-scored ones; trying them first is
+             what lets alpha-beta cut off at MIN nodes.
 
         This is the main performance hotspot: re-simulation is relatively
         cheap, DFS is very expensive—so we cache DFS results per team.
@@ -149,15 +196,16 @@ class MinimaxAgent:
             if not replay.is_game_over():
                 replay.start_turn(opponent)
 
-            score = self._eval_snapshot(replay.get_board_snapshot(), eval_team)
+            score = self._eval_sim(replay, eval_team)
             scored_children.append((seq, score, replay))
 
             logger.debug(
                 f"[MinimaxAgent] Seq #{idx} | len={len(seq)} | score={score:.4f}"
             )
 
-        # Sort by score descending (best first)
-        scored_children.sort(key=lambda x: x[1], reverse=True)
+        # Best first for whoever acts: descending for eval_team, ascending
+        # for its opponent
+        scored_children.sort(key=lambda x: x[1], reverse=acting_team == eval_team)
 
         if self.child_limit:
             scored_children = scored_children[: self.child_limit]
@@ -178,6 +226,8 @@ class MinimaxAgent:
 
         # 🔄 Reset sequence cache for this full AI move
         self._sequence_cache.clear()
+        self._eval_cache.clear()
+        self._tt.clear()
 
         # Child generator wrapper: minimax calls this
         def child_gen(sim, acting_team):
@@ -200,51 +250,100 @@ class MinimaxAgent:
             logger.warning("[MinimaxAgent] No legal root sequences")
             return
 
+        # -------------------------------------------------------------
+        # Iterative deepening over the top-level children: each pass
+        # tries them in the order of the previous pass's scores
+        # -------------------------------------------------------------
         best_score = -inf
         best_seq = None
 
-        # -------------------------------------------------------------
-        # Evaluate each top-level child with minimax
-        # -------------------------------------------------------------
+        for depth in range(1, self.depth + 1):
+            alpha, beta = -inf, inf
+            if self.aspiration_window is not None and best_score > -inf:
+                alpha = best_score - self.aspiration_window
+                beta = best_score + self.aspiration_window
+
+            best_score, best_seq, scores = self._search_root(
+                root_children, team_id, depth, alpha, beta, child_gen
+            )
+            windowed = alpha > -inf or beta < inf
+            if windowed and not alpha < best_score < beta:
+                # Failed outside the aspiration window: the value is only a
+                # bound, so search again with a full window
+                best_score, best_seq, scores = self._search_root(
+                    root_children, team_id, depth, -inf, inf, child_gen
+                )
+
+            ranked = sorted(
+                zip(scores, root_children), key=lambda x: x[0], reverse=True
+            )
+            root_children = [child for _score, child in ranked]
+
+        logger.info(
+            f"[MinimaxAgent] Best score={best_score:.4f} "
+            f"(thinking time={time.time() - start_total:.3f}s)"
+        )
+
+        if not best_seq:
+            logger.warning("[MinimaxAgent] No best sequence found")
+            return
+
+        # Apply chosen sequence to real game
+        logger.info(f"[MinimaxAgent] Executing sequence (len={len(best_seq)})")
+        for act in best_seq:
+            logger.debug(f"[MinimaxAgent] → {act}")
+            game_api.apply_action(act)
+
+    def _search_root(
+        self,
+        root_children,
+        team_id: int,
+        depth: int,
+        alpha: float,
+        beta: float,
+        child_gen,
+    ) -> tuple[float, list[dict] | None, list[float]]:
+        """
+        Alpha-beta over the top-level children at `depth`.
+
+        Returns (best score, its sequence, per-child scores). A child whose
+        search failed low against the best score so far only has an upper
+        bound as its score; children after a fail-high cutoff get -inf.
+        """
+        best_score = -inf
+        best_seq = None
+        scores = [-inf] * len(root_children)
+
         for idx, (seq, child_sim) in enumerate(root_children):
             logger.debug(
-                f"[MinimaxAgent] Running minimax on child #{idx} (len={len(seq)})"
+                f"[MinimaxAgent] Running minimax on child #{idx} "
+                f"(len={len(seq)}, depth={depth})"
             )
 
             t_child = time.time()
             score = self._minimax(
                 sim=child_sim,
                 team_id=team_id,
-                depth=self.depth,
-                alpha=-inf,
-                beta=inf,
+                depth=depth,
+                alpha=max(alpha, best_score),
+                beta=beta,
                 is_max=False,  # opponent acts next
                 child_gen=child_gen,
             )
+            scores[idx] = score
 
             logger.info(
                 f"[MinimaxAgent] Child #{idx} → minimax={score:.4f} "
-                f"({time.time() - t_child:.3f}s)"
+                f"(depth={depth}, {time.time() - t_child:.3f}s)"
             )
 
             if score > best_score:
                 best_score = score
                 best_seq = seq
+            if best_score >= beta:
+                break
 
-        logger.info(
-            f"[MinimaxAgent] Best score={best_score:.4f} "
-            f"(thinking time={time.time() - start_total:.3f}s)"
-        )
-
-        if not best_seq:
-            logger.warning("[MinimaxAgent] No best sequence found")
-            return
-
-        # Apply chosen sequence to real game
-        logger.info(f"[MinimaxAgent] Executing sequence (len={len(best_seq)})")
-        for act in best_seq:
-            logger.debug(f"[MinimaxAgent] → {act}")
-            game_api.apply_action(act)
+        return best_score, best_seq, scores
 
     def play_turn(self, game_api, team_id: int):
         logger.info(f"[MinimaxAgent] play_turn(team={team_id})")
@@ -270,19 +369,60 @@ class MinimaxAgent:
         - `is_max` tells whether this node is MAX or MIN.
         - `child_gen(sim, acting_team)` returns [(sequence, new_sim), ...]
           and internally reuses cached sequences per team.
+
+        Results are stored in a transposition table with their search depth
+        and whether they are exact or only a bound for the alpha-beta window.
         """
+        key = _position_key(sim)
 
         # Terminal node
         if depth == 0 or sim.is_game_over():
-            return self._eval_snapshot(sim.get_board_snapshot(), team_id)
+            return self._eval_sim(sim, team_id, key)
+
+        tt_key = (key, is_max)
+        entry = self._tt.get(tt_key)
+        if entry is not None and entry[0] >= depth:
+            _depth, value, flag = entry
+            if flag == _EXACT:
+                return value
+            if flag == _LOWER:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value
 
         acting_team = team_id if is_max else (1 if team_id == 2 else 2)
 
         # Generate children using cached sequences
         children = child_gen(sim, acting_team)
         if not children:
-            return self._eval_snapshot(sim.get_board_snapshot(), team_id)
+            return self._eval_sim(sim, team_id, key)
+
+        best = self._search_children(
+            children, team_id, depth, alpha, beta, is_max, child_gen
+        )
+
+        if best <= alpha:
+            flag = _UPPER
+        elif best >= beta:
+            flag = _LOWER
+        else:
+            flag = _EXACT
+        self._tt[tt_key] = (depth, best, flag)
+        return best
 
+    def _search_children(
+        self,
+        children,
+        team_id: int,
+        depth: int,
+        alpha: float,
+        beta: float,
+        is_max: bool,
+        child_gen,
+    ) -> float:
+        """Alpha-beta over `children` of a MAX or MIN node."""
         # -------------------------------------------------------
         # MAX node
         # -------------------------------------------------------
@@ -1,15 +1,10 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import numpy as np
 
 from ai.neat.neat_network import NeatNetwork
-from ai.utils.nn_utils import encode_state, encode_state_old
-
-if TYPE_CHECKING:
-    pass
-
-
 from ai.planning.action_planning import ActionPlannerReversible
+from ai.utils.nn_utils import encode_state_old, encode_state_old_batch
 
 
 class NeatAgent:
@@ -19,25 +14,47 @@ class NeatAgent:
         dfs_action_sets_limit=1500,
         dfs_branching_limit=30,
         exploration_rate=0.00,
+        ordering_depth=1,
+        prune_margin=None,
+        prescore_top_k=None,
+        prune_dominated=False,
+        planner: ActionPlannerReversible | None = None,
     ):
         self.brain = brain
-        self.planner = ActionPlannerReversible(
-            dfs_action_sets_limit=dfs_action_sets_limit,
-            dfs_branching_limit=dfs_branching_limit,
-            exploration_rate=exploration_rate,
-        )
+        # A shared planner (e.g. both sides of a self-play match) overrides
+        # the planner arguments above; its transposition tables are per team.
+        if planner is None:
+            planner = ActionPlannerReversible(
+                dfs_action_sets_limit=dfs_action_sets_limit,
+                dfs_branching_limit=dfs_branching_limit,
+                exploration_rate=exploration_rate,
+                ordering_depth=ordering_depth,
+                prune_margin=prune_margin,
+                prescore_top_k=prescore_top_k,
+                prune_dominated=prune_dominated,
+            )
+        self.planner = planner
+        # Feature buffer reused by every _eval call (encode_state_old: 40
+        # features); its contents are only valid until the next call
+        self._features = np.empty(40, dtype=np.float32)
 
     def setup_brain(self, brain):
         self.brain = brain
+        # Cached scores came from the previous brain
+        self.planner.clear_cache()
 
     # ------------------------------------------------------------------
     # State Encoding & Evaluation
     # ------------------------------------------------------------------
 
     def _eval(self, snapshot, team_id):
-        state = encode_state_old(snapshot, team_id)
+        state = encode_state_old(snapshot, team_id, out=self._features)
         return float(self.brain.predict(state)[0])
 
+    def _eval_batch(self, snapshots, team_id):
+        states = encode_state_old_batch(snapshots, team_id)
+        return self.brain.predict_batch(states)[:, 0]
+
     def execute_next_actions(self, game_api, team_id):
         board = game_api.game_board
 
@@ -45,6 +62,7 @@ class NeatAgent:
             board,
             team_id,
             eval_fn=lambda snap: self._eval(snap, team_id),
+            batch_eval_fn=lambda snaps: self._eval_batch(snaps, team_id),
         )
 
         for act in actions:
@@ -2,21 +2,45 @@ from __future__ import annotations
 
 import math
 import random
-from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from dataclasses import dataclass
 
+import numpy as np
+
 from ai.neat.neat_network import NeatNetwork
 from ai.planning.action_planning import ActionPlannerReversible
 from ai.utils.nn_utils import encode_state
 from api.simulation_api import SimulationAPI
+from utils.helpers import reseed_random
 from utils.logging import logger
 
+# Per-process rollout state, set once per pool by _init_rollout_worker()
+_worker_snapshot: dict | None = None
+_worker_brain: NeatNetwork | None = None
+# Feature buffer reused by every rollout in the worker (encode_state)
+_worker_features: np.ndarray | None = None
+
+
+def _init_rollout_worker(snapshot: dict, brain_bytes: bytes) -> None:
+    """
+    Pool initializer: keep the turn's snapshot, the restored brain and a
+    feature buffer for every rollout this worker runs, and reseed `random`
+    so forked workers do not replay the parent's (identical) random stream.
+    """
+    global _worker_snapshot, _worker_brain, _worker_features
+    _worker_snapshot = snapshot
+    _worker_brain = NeatNetwork.restore(brain_bytes)
+    _worker_features = np.empty(38, dtype=np.float32)
+    reseed_random()
+
 
 @dataclass
 class _MCTSChildStats:
     sequence: list[dict]
     visits: int = 0
     value_sum: float = 0.0
+    # Rollouts dispatched but not yet collected (virtual visits)
+    pending: int = 0
 
     @property
     def q_value(self) -> float:
@@ -41,6 +65,8 @@ class MCTSAgent:
         self.rollout_turns = rollout_turns
         self.c_puct = c_puct
         self.max_workers = max_workers  # 🔥 store worker count
+        # Feature buffer reused by every _eval_snapshot call (encode_state)
+        self._features = np.empty(38, dtype=np.float32)
 
         self.planner = ActionPlannerReversible(
             dfs_action_sets_limit=dfs_action_sets_limit,
@@ -53,23 +79,20 @@ class MCTSAgent:
     # ----------------------------------------------------------------------
     @staticmethod
     def _rollout_worker(
-        snapshot: dict,
         sequence: list[dict],
         team_id: int,
         rollout_turns: int,
-        brain_weights: bytes,
     ) -> float:
         """
-        Worker process:
-        - rebuild SimulationAPI from snapshot
-        - rebuild NEAT brain from bytes
+        Worker process (see _init_rollout_worker()):
+        - rebuild SimulationAPI from the turn's snapshot
         - apply the selected root sequence
         - simulate rollout_turns random full turns
         - return final NEAT evaluation
         """
 
         # --- rebuild SimulationAPI ---
-        sim = SimulationAPI.from_snapshot(snapshot)
+        sim = SimulationAPI.from_snapshot(_worker_snapshot)
 
         opponent = 1 if team_id == 2 else 2
 
@@ -82,9 +105,6 @@ class MCTSAgent:
         if not sim.is_game_over():
             sim.start_turn(opponent)
 
-        # --- rebuild brain ---
-        brain = NeatNetwork.restore(brain_weights)
-
         # --- rollout ---
         for _ in range(rollout_turns):
             if sim.is_game_over():
@@ -108,35 +128,28 @@ class MCTSAgent:
                 sim.apply_action(random.choice(legal))
 
         # --- evaluate final state ---
-        state = encode_state(sim.get_board_snapshot(), team_id)
-        return float(brain.predict(state)[0])
+        state = encode_state(sim.get_board_snapshot(), team_id, out=_worker_features)
+        return float(_worker_brain.predict(state)[0])
 
     # ----------------------------------------------------------------------
     # NEAT evaluation helper
     # ----------------------------------------------------------------------
     def _eval_snapshot(self, snapshot, team_id):
-        state = encode_state(snapshot, team_id)
+        state = encode_state(snapshot, team_id, out=self._features)
         return float(self.brain.predict(state)[0])
 
     # ----------------------------------------------------------------------
     # Generate/prune root sequences
     # ----------------------------------------------------------------------
     def _generate_root_moves(self, game_board, team_id):
-        sequences = self.planner.plan_sequences(game_board, team_id)
-        if not sequences:
+        leaves = self.planner.plan_sequences(
+            game_board, team_id, with_snapshots=True, unique=True
+        )
+        if not leaves:
             return []
 
-        sim_root = SimulationAPI(game_board.fast_clone())
-        sim_root.start_turn(team_id)
-
-        scored = []
-        for seq in sequences:
-            replay = sim_root.clone()
-            replay.start_turn(team_id)
-            for act in seq:
-                replay.apply_action(act)
-            val = self._eval_snapshot(replay.get_board_snapshot(), team_id)
-            scored.append((seq, val))
+        # The DFS already reached each sequence's end state; score it directly
+        scored = [(seq, self._eval_snapshot(snap, team_id)) for seq, snap in leaves]
 
         scored.sort(key=lambda x: x[1], reverse=True)
         scored = scored[: self.max_root_children]
@@ -152,10 +165,13 @@ class MCTSAgent:
         best_score = -1e9
 
         for i, ch in enumerate(children):
-            if ch.visits == 0:
+            # In-flight rollouts count as visits so concurrent selections
+            # spread over the children instead of piling onto one
+            n = ch.visits + ch.pending
+            if n == 0:
                 ucb = float("inf")
             else:
-                ucb = ch.q_value + self.c_puct * math.sqrt(log_n / ch.visits)
+                ucb = ch.q_value + self.c_puct * math.sqrt(log_n / n)
 
             if ucb > best_score:
                 best_score = ucb
@@ -179,35 +195,45 @@ class MCTSAgent:
         brain_bytes = self.brain.serialize()
 
         total_visits = 0
-        pending = []
+        submitted = 0
+        in_flight = {}
 
         logger.info(f"[MCTS] Running {self.iterations} parallel iterations...")
 
-        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
-            for _ in range(self.iterations):
-                # SELECT
-                idx = self._select_child_ucb(root_children, total_visits)
-                child = root_children[idx]
-
-                # DISPATCH WORK TO PROCESS  🔥 PARALLEL
-                future = executor.submit(
-                    MCTSAgent._rollout_worker,
-                    initial_snapshot,
-                    child.sequence,
-                    team_id,
-                    self.rollout_turns,
-                    brain_bytes,
-                )
-                pending.append((idx, future))
-
-            # COLLECT RESULTS
-            for idx, future in pending:
-                value = future.result()
-
-                ch = root_children[idx]
-                ch.visits += 1
-                ch.value_sum += value
-                total_visits += 1
+        # Keep max_workers rollouts in flight and select each new one with the
+        # results collected so far (root parallelization).
+        with ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=_init_rollout_worker,
+            initargs=(initial_snapshot, brain_bytes),
+        ) as executor:
+            while submitted < self.iterations or in_flight:
+                while submitted < self.iterations and len(in_flight) < self.max_workers:
+                    # SELECT
+                    idx = self._select_child_ucb(
+                        root_children, total_visits + len(in_flight)
+                    )
+                    child = root_children[idx]
+                    child.pending += 1
+
+                    # DISPATCH WORK TO PROCESS  🔥 PARALLEL
+                    future = executor.submit(
+                        MCTSAgent._rollout_worker,
+                        child.sequence,
+                        team_id,
+                        self.rollout_turns,
+                    )
+                    in_flight[future] = idx
+                    submitted += 1
+
+                # COLLECT RESULTS
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    ch = root_children[in_flight.pop(future)]
+                    ch.pending -= 1
+                    ch.visits += 1
+                    ch.value_sum += future.result()
+                    total_visits += 1
 
         # choose best root child
         best_child = max(root_children, key=lambda c: (c.visits, c.q_value))
@@ -10,7 +10,8 @@ if TYPE_CHECKING:
     from api.simulation_api import SimulationAPI
 
 from backend.board import GameState, create_random_map
-from utils.constants import UNIT_STATS, TeamType
+from utils.constants import UNIT_STATS, AgentType, TeamType, TileType
+from utils.helpers import team_hp_and_alive
 
 
 class SelfPlaySimulator:
@@ -24,31 +25,45 @@ class SelfPlaySimulator:
         config,
         base_api: "SimulationAPI",
         max_turns: int,
+        map_pool: list[list[list[TileType]]] | None = None,
     ) -> None:
         self.config = config
         self.base_api = base_api
         self.max_turns = max_turns
+        # Pre-generated tile maps picked by index in _setup_match(); tile maps
+        # are never mutated, so matches can share them
+        self.map_pool = map_pool or []
 
-        self.match_api: SimulationAPI = self.base_api.clone()
+        # Replaced by a fresh clone of base_api in every _setup_match()
+        self.match_api: SimulationAPI = self.base_api
+        self._initial_counts: tuple[int, int] = (0, 0)
+        self._max_hp: tuple[int, int] = (0, 0)
 
     # ------------------------------------------------------------------
     # Match setup
     # ------------------------------------------------------------------
-    def _setup_match(self) -> tuple[list[str], list[str]]:
+    def _setup_match(self, map_idx: int | None = None) -> tuple[list[str], list[str]]:
         """
-        Create a new random map and draft units for both teams.
+        Create a new board and draft units for both teams.
+
+        The board uses map_pool[map_idx] (wrapped around) when both are
+        given, and a new random map otherwise.
         """
-        # Clone the headless API so we have fresh GameLogic + GameState wrapper
-        self.match_api = self.base_api.clone()
+        if map_idx is not None and self.map_pool:
+            tile_map = self.map_pool[map_idx % len(self.map_pool)]
+        else:
+            tile_map = create_random_map(8, 8)
 
         # Create new game board
         game_board = GameState(
             width=8,
             height=8,
             cell_size=64,
-            tile_map=create_random_map(8, 8),
+            tile_map=tile_map,
         )
-        self.match_api.reset(game_board=game_board)
+        # Fresh headless API (GameLogic + wrapper) on the new board; the base
+        # board's units would be discarded, so they are not copied
+        self.match_api = self.base_api.clone(game_board=game_board)
 
         # Add AI units for both teams (keep your current draft logic)
         team1_draft_names = get_ai_draft_units(funds=100)
@@ -57,36 +72,27 @@ class SelfPlaySimulator:
         self.match_api.add_units(team1_draft_names, team_id=1, team=TeamType.AI)
         self.match_api.add_units(team2_draft_names, team_id=2, team=TeamType.AI)
 
+        # Draft invariants read by _compute_stats()
+        self._initial_counts = (len(team1_draft_names), len(team2_draft_names))
+        self._max_hp = (
+            sum(UNIT_STATS[name]["health"] for name in team1_draft_names),
+            sum(UNIT_STATS[name]["health"] for name in team2_draft_names),
+        )
+
         return team1_draft_names, team2_draft_names
 
     # ------------------------------------------------------------------
     # Helper: compute summary stats for fitness
     # ------------------------------------------------------------------
-    def _compute_stats(
-        self, drafted_unit_names: tuple[list[str], list[str]]
-    ) -> dict[str, float]:
+    def _compute_stats(self) -> dict[str, float]:
         """
         Compute simple summary statistics for both teams
         """
 
-        initial_unit_count_team1 = len(drafted_unit_names[0])
-        initial_unit_count_team2 = len(drafted_unit_names[1])
-
-        max_hp_team1 = sum(UNIT_STATS[name]["health"] for name in drafted_unit_names[0])
-        max_hp_team2 = sum(UNIT_STATS[name]["health"] for name in drafted_unit_names[1])
-
-        snapshot = self.match_api.get_board_snapshot()
-        units = snapshot["units"]
+        initial_unit_count_team1, initial_unit_count_team2 = self._initial_counts
+        max_hp_team1, max_hp_team2 = self._max_hp
 
-        team1 = [u for u in units if u["team_id"] == 1]
-        team2 = [u for u in units if u["team_id"] == 2]
-
-        hp1 = sum(u["health"] for u in team1)
-
-        hp2 = sum(u["health"] for u in team2)
-
-        alive1 = len(team1)
-        alive2 = len(team2)
+        hp1, hp2, alive1, alive2 = team_hp_and_alive(self.match_api.game_board.units)
 
         return {
             "initial_unit_count_team1": initial_unit_count_team1,
@@ -99,39 +105,56 @@ class SelfPlaySimulator:
             "hp2": hp2,
         }
 
+    @staticmethod
+    def _winner(stats: dict[str, float]) -> int | None:
+        """
+        GameLogic.get_winner() read off _compute_stats()'s alive counts,
+        without another pass over the units: 1, 2, 0 (draw) or None.
+        """
+        if stats["alive1"] and stats["alive2"]:
+            return None
+        if not stats["alive1"] and not stats["alive2"]:
+            return 0
+        return 1 if stats["alive1"] else 2
+
     # ------------------------------------------------------------------
     # Main match loop
     # ------------------------------------------------------------------
-    def play_match(self, genome_a, genome_b, agent_type):
-        drafted_unit_names = self._setup_match()
-
-        net_a = NeatNetwork.from_genome(genome_a, self.config)
-        net_b = NeatNetwork.from_genome(genome_b, self.config)
+    def play_match(
+        self,
+        net_a: NeatNetwork,
+        net_b: NeatNetwork,
+        agent_type,
+        map_idx: int | None = None,
+    ):
+        """
+        Play one match between two prebuilt networks (build them once with
+        NeatNetwork.from_genome() and reuse them across matches), on pool
+        map `map_idx` if given (see _setup_match()).
+        """
+        self._setup_match(map_idx)
 
         agent_a = AgentFactory.create(agent_type=agent_type, brain=net_a)
-        agent_b = AgentFactory.create(agent_type=agent_type, brain=net_b)
+        # NEAT agents on both sides share one planner: it keeps a separate
+        # transposition table per team, so only the Zobrist keys are shared.
+        shared = {}
+        if agent_type.strip() == AgentType.NEATAgent.value:
+            shared["planner"] = agent_a.planner
+        agent_b = AgentFactory.create(agent_type=agent_type, brain=net_b, **shared)
 
         turns_played = 0
 
         for t in range(self.max_turns):
-            # --- Team 1 turn ---
-            self.match_api.start_turn(1)
-            agent_a.execute_next_actions(self.match_api, team_id=1)
-            if self.match_api.is_game_over():
-                turns_played = t + 1
-                stats = self._compute_stats(drafted_unit_names)
-                return self.match_api.get_winner(), turns_played, stats
-
-            # --- Team 2 turn ---
-            self.match_api.start_turn(2)
-            agent_b.execute_next_actions(self.match_api, team_id=2)
-            if self.match_api.is_game_over():
-                turns_played = t + 1
-                stats = self._compute_stats(drafted_unit_names)
-                return self.match_api.get_winner(), turns_played, stats
-
             turns_played = t + 1
-
-        stats = self._compute_stats(drafted_unit_names)
-        winner = self.match_api.get_winner()
-        return winner, turns_played, stats
+            # --- Team 1 turn, then team 2 turn ---
+            for team_id, agent in ((1, agent_a), (2, agent_b)):
+                self.match_api.start_turn(team_id)
+                agent.execute_next_actions(self.match_api, team_id=team_id)
+                if self.match_api.is_game_over():
+                    break
+            else:
+                continue
+            break
+
+        stats = self._compute_stats()
+        return self._winner(stats), turns_played, stats
@@ -8,10 +8,66 @@ from pathlib import Path
 import neat
 import numpy as np
 
+from ai.neat.neat_network import NeatNetwork
 from ai.neat.neat_selfplay import SelfPlaySimulator
 from api.simulation_api import SimulationAPI
+from backend.board import create_random_map
+from utils.constants import TileType
+from utils.helpers import reseed_random
 from utils.path_utils import get_asset_path
 
+# Per-process match state, set once per pool by _init_match_worker()
+_worker_sim: SelfPlaySimulator | None = None
+# Networks built in this worker for the current generation, by genome id
+_worker_nets: dict[int, NeatNetwork] = {}
+_worker_generation: int = -1
+
+
+def _init_match_worker(
+    config_path: str,
+    game_api: "SimulationAPI",
+    max_turns: int,
+    map_pool: list[list[list[TileType]]],
+) -> None:
+    """
+    Pool initializer: build the NEAT config and the SelfPlaySimulator once
+    for every match this worker runs (the simulator clones its base API per
+    match), and reseed `random` so forked workers draw different drafts.
+    """
+    global _worker_sim
+    config = neat.Config(
+        neat.DefaultGenome,
+        neat.DefaultReproduction,
+        neat.DefaultSpeciesSet,
+        neat.DefaultStagnation,
+        config_path,
+    )
+    _worker_sim = SelfPlaySimulator(
+        config, game_api, max_turns=max_turns, map_pool=map_pool
+    )
+    reseed_random()
+
+
+def _worker_net(generation: int, genome_data: tuple[int, bytes]) -> NeatNetwork:
+    """
+    Network for a genome, built once per worker and generation: a genome
+    plays several matches per generation, often on the same worker.
+    """
+    global _worker_generation
+    if generation != _worker_generation:
+        _worker_nets.clear()
+        _worker_generation = generation
+
+    gid, g_bytes = genome_data
+    net = _worker_nets.get(gid)
+    if net is None:
+        # Rebuild the genome from its pickled dict
+        genome = neat.DefaultGenome(gid)
+        genome.__dict__.update(pickle.loads(g_bytes))
+        net = NeatNetwork.from_genome(genome, _worker_sim.config)
+        _worker_nets[gid] = net
+    return net
+
 
 class NeatTrainer:
     """
@@ -26,6 +82,7 @@ class NeatTrainer:
         max_workers: int,
         max_turns: int,
         agent: str,
+        map_pool_size: int = 32,
     ) -> None:
         # 🔥 Always resolve config path through get_asset_path()
         self.config_path = get_asset_path(config_path)
@@ -43,6 +100,13 @@ class NeatTrainer:
         self.opponents_per_genome = opponents_per_genome
         self.max_turns = max_turns
         self.agent_type = agent
+        # Fixed set of maps cycled through by the matches (0: a new random
+        # map per match); both legs of a pairing use the same map, which
+        # keeps fitness comparable between the two genomes
+        self._map_pool = [create_random_map(8, 8) for _ in range(map_pool_size)]
+        # Worker pool kept alive for the whole run() (see _make_executor())
+        self.executor: ProcessPoolExecutor | None = None
+        self._generation = 0
         # 🔥 Save best genome here (safe in both dev + exe):
         self.model_output = Path(get_asset_path("assets/neat/genomes/best_genome.pkl"))
         self.model_output.parent.mkdir(parents=True, exist_ok=True)
@@ -59,7 +123,9 @@ class NeatTrainer:
         return np.log1p(np.exp(-abs(beta * x))) + max(beta * x, 0)
 
     def relu(self, x):
-        return np.maximum(x, 0)
+        # compute_fitness passes plain floats: max() skips numpy's scalar
+        # boxing and keeps genome fitness a Python float
+        return max(x, 0.0)
 
     def compute_fitness(self, winner, played_turns, max_turns, stats):
         # --- 1. HP preservation & damage dealt ---
@@ -95,46 +161,66 @@ class NeatTrainer:
     # ============================================================
     @staticmethod
     def _run_match(
-        config_path: str,
-        game_api: "SimulationAPI",
+        generation: int,
         genome_a_data: tuple[int, bytes],
         genome_b_data: tuple[int, bytes],
-        max_turns: int,
         agent_type: str,
+        map_idx: int,
     ) -> tuple[int, int, int | None, int, dict[str, float]]:
         """
-        Runs a single match in an isolated process.
+        Runs a single match in a pool worker (see _init_match_worker()).
 
         Returns:
           (gid_a, gid_b, winner, played_turns, stats)
         """
-        gid_a, g_a_bytes = genome_a_data
-        gid_b, g_b_bytes = genome_b_data
-
-        # 🔥 Config path is already absolute and correct
-        config = neat.Config(
-            neat.DefaultGenome,
-            neat.DefaultReproduction,
-            neat.DefaultSpeciesSet,
-            neat.DefaultStagnation,
-            config_path,
-        )
-
-        # Rebuild genomes from pickled dicts
-        genome_a = neat.DefaultGenome(gid_a)
-        genome_b = neat.DefaultGenome(gid_b)
-        genome_a.__dict__.update(pickle.loads(g_a_bytes))
-        genome_b.__dict__.update(pickle.loads(g_b_bytes))
-
-        sim = SelfPlaySimulator(config, game_api, max_turns=max_turns)
+        gid_a = genome_a_data[0]
+        gid_b = genome_b_data[0]
+        net_a = _worker_net(generation, genome_a_data)
+        net_b = _worker_net(generation, genome_b_data)
 
         print(f"Match between: {gid_a} and {gid_b} starts.")
-        winner, played_turns, stats = sim.play_match(
-            genome_a, genome_b, agent_type=agent_type
+        winner, played_turns, stats = _worker_sim.play_match(
+            net_a, net_b, agent_type=agent_type, map_idx=map_idx
         )
 
         return gid_a, gid_b, winner, played_turns, stats
 
+    @staticmethod
+    def _run_pairing(
+        generation: int,
+        genome_a_data: tuple[int, bytes],
+        genome_b_data: tuple[int, bytes],
+        agent_type: str,
+        map_idx: int,
+    ) -> list[tuple[int, int, int | None, int, dict[str, float]]]:
+        """
+        Runs both legs of a pairing in one pool task: A vs B (A is team 1),
+        then B vs A. The genomes travel once, and the second leg reuses the
+        networks built for the first.
+        """
+        return [
+            NeatTrainer._run_match(
+                generation, genome_a_data, genome_b_data, agent_type, map_idx
+            ),
+            NeatTrainer._run_match(
+                generation, genome_b_data, genome_a_data, agent_type, map_idx
+            ),
+        ]
+
+    def _make_executor(self) -> ProcessPoolExecutor:
+        """Worker pool whose processes each hold a ready SelfPlaySimulator."""
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=_init_match_worker,
+            # initargs are pickled to each worker, which is a copy already
+            initargs=(
+                self.config_path,
+                self.base_game_api,
+                self.max_turns,
+                self._map_pool,
+            ),
+        )
+
     # ============================================================
     # 🧮 Genome Evaluation
     # ============================================================
@@ -143,12 +229,17 @@ class NeatTrainer:
         Evaluate genomes via self-play.
 
         Strategy:
-          - For each genome, pick up to `opponents_per_genome` random opponents.
-          - Play 2 matches per opponent:
+          - Shuffle the genomes into a circle and pair each one with the next
+            `opponents_per_genome` (O(k*N) pairings instead of a full
+            round-robin): every genome meets min(2k, N-1) distinct opponents.
+          - Play 2 matches per opponent, on the same map from the pool:
               A vs B   (A is team 1)
               B vs A   (B is team 1)
           - Normalize each genome's fitness by the number of matches played.
         """
+        # Workers key their cached networks by generation
+        self._generation += 1
+
         # Reset NEAT's fitness for this generation
         fitness_sums: dict[int, float] = {}
         match_counts: dict[int, int] = {}
@@ -161,53 +252,52 @@ class NeatTrainer:
             # Store the internal dict of each genome
             genome_data[gid] = pickle.dumps(genome.__dict__)
 
-        genome_ids = list(genome_data.keys())
-        matches: list[tuple[tuple[int, bytes], tuple[int, bytes]]] = []
-
-        # Build symmetric matches
-        for gid_a in genome_ids:
-            # All other genomes are potential opponents
-            candidates = [gid for gid in genome_ids if gid != gid_a]
-            if not candidates:
-                continue
-
-            k = min(self.opponents_per_genome, len(candidates))
-            opponents = random.sample(candidates, k=k)
-
-            for gid_b in opponents:
-                g_a_data = (gid_a, genome_data[gid_a])
-                g_b_data = (gid_b, genome_data[gid_b])
-
-                # A as team 1 vs B as team 2
-                matches.append((g_a_data, g_b_data))
-                # B as team 1 vs A as team 2
-                matches.append((g_b_data, g_a_data))
-
-        # Parallel processing
-        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = []
-            for g_a_data, g_b_data in matches:
-                game_clone = self.base_game_api.clone()
-                futures.append(
-                    executor.submit(
-                        NeatTrainer._run_match,
-                        self.config_path,
-                        game_clone,
-                        g_a_data,
-                        g_b_data,
-                        self.max_turns,
-                        self.agent_type,
-                    )
+        # Balanced pairing schedule: in a random circular order, each genome
+        # meets the next `opponents_per_genome` genomes (and so the previous
+        # ones too). Every genome gets the same number of distinct opponents;
+        # a pair reached from both sides is played only once.
+        order = list(genome_data.keys())
+        random.shuffle(order)
+        n = len(order)
+
+        pairs: set[tuple[int, int]] = set()
+        for offset in range(1, min(self.opponents_per_genome, n - 1) + 1):
+            for i, gid_a in enumerate(order):
+                gid_b = order[(i + offset) % n]
+                pairs.add((gid_a, gid_b) if gid_a < gid_b else (gid_b, gid_a))
+
+        # Parallel processing (on the run()-wide pool when there is one)
+        executor = self.executor
+        own_executor = executor is None
+        if own_executor:
+            executor = self._make_executor()
+        try:
+            # One task per pairing: both symmetric matches, on the same pool map
+            futures = [
+                executor.submit(
+                    NeatTrainer._run_pairing,
+                    self._generation,
+                    (gid_a, genome_data[gid_a]),
+                    (gid_b, genome_data[gid_b]),
+                    self.agent_type,
+                    map_idx,
                 )
+                for map_idx, (gid_a, gid_b) in enumerate(pairs)
+            ]
 
             for f in as_completed(futures):
-                gid_a, gid_b, winner, turns, stats = f.result()
-                f_a, f_b = self.compute_fitness(winner, turns, self.max_turns, stats)
+                for gid_a, gid_b, winner, turns, stats in f.result():
+                    f_a, f_b = self.compute_fitness(
+                        winner, turns, self.max_turns, stats
+                    )
 
-                fitness_sums[gid_a] += f_a
-                fitness_sums[gid_b] += f_b
-                match_counts[gid_a] += 1
-                match_counts[gid_b] += 1
+                    fitness_sums[gid_a] += f_a
+                    fitness_sums[gid_b] += f_b
+                    match_counts[gid_a] += 1
+                    match_counts[gid_b] += 1
+        finally:
+            if own_executor:
+                executor.shutdown()
 
         # Normalize
         for gid, genome in genomes:
@@ -224,7 +314,13 @@ class NeatTrainer:
         stats = neat.StatisticsReporter()
         pop.add_reporter(stats)
 
-        winner = pop.run(self.eval_genomes, generations)
+        # One pool for the whole evolution instead of one per generation
+        with self._make_executor() as executor:
+            self.executor = executor
+            try:
+                winner = pop.run(self.eval_genomes, generations)
+            finally:
+                self.executor = None
 
         if winner is None:
             print("\nNo winner genome produced.")
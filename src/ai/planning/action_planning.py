@@ -1,35 +1,130 @@
 # ai/planning/full_turn_dfs.py
 from __future__ import annotations
 
+import heapq
 import random
-from typing import Any, Callable
+from typing import Any, Callable, Optional
 
-from api.simulation_api import SimulationAPI
 from backend.board import GameState
-from backend.logic import GameLogic
+from backend.logic import GameLogic, UndoRecord
+from backend.units import Unit
+from utils.constants import EPSILON
+from utils.helpers import manhattan
+
+# Transposition tables are cleared once they reach this size.
+TT_MAX_ENTRIES = 1_000_000
 
 
 class _SimulationAPI:
     """
     Minimal simulation wrapper for DFS.
+
+    Actions are applied in place with push() and reverted with pop(), so a
+    whole search runs on a single board instead of cloning it per node.
+
+    `hash` is a Zobrist hash of the units, kept up to date incrementally by
+    push()/pop() so transposed action orders map to the same key.
+
+    Simulations built with the same `zobrist` table (see _new_zobrist())
+    hash identical unit states identically, so their hashes can share a
+    transposition table.
     """
 
-    def __init__(self, board: GameState):
+    def __init__(
+        self,
+        board: GameState,
+        zobrist: Optional[tuple[dict[tuple, int], random.Random]] = None,
+    ):
         self.game_board = board
-        self.game_logic = GameLogic(self.game_board)
+        self.game_logic = GameLogic(self.game_board, log_actions=False)
+
+        # Zobrist keys are drawn lazily per unit state; a private RNG keeps
+        # the global `random` stream (DFS shuffles) untouched.
+        self._zobrist, self._zobrist_rng = zobrist or _new_zobrist()
+        self._hash_stack: list[int] = []
+        self.hash = self._full_hash()
+
+        # Undone records, refilled by push() instead of allocating new ones
+        self._undo_pool: list[UndoRecord] = []
 
-    def clone(self) -> "_SimulationAPI":
-        new_board = self.game_board.fast_clone()
-        return _SimulationAPI(new_board)
+        # (hash, team_id) -> legal actions; transposed paths reuse the list
+        self._legal_cache: dict[tuple[int, int], list[dict[str, Any]]] = {}
+
+    # ------------------------------------------------------------
+    # Zobrist hashing
+    # ------------------------------------------------------------
+    def _unit_key(self, uid: int, state: tuple) -> int:
+        x, y, health, move_points, has_attacked, has_acted = state[:6]
+        # check_turn_end() flips has_acted for exhausted units, so fold that
+        # into the flag to keep the key stable across those calls.
+        done = has_acted or move_points <= EPSILON
+        key_state = (uid, x, y, health, move_points, has_attacked, done)
+
+        key = self._zobrist.get(key_state)
+        if key is None:
+            key = self._zobrist_rng.getrandbits(64)
+            self._zobrist[key_state] = key
+        return key
+
+    def _live_key(self, unit: Unit) -> int:
+        return self._unit_key(unit.id, GameLogic.unit_state(unit))
+
+    def _full_hash(self) -> int:
+        h = 0
+        for u in self.game_board.units:
+            h ^= self._live_key(u)
+        return h
+
+    # ------------------------------------------------------------
+    # Reversible actions
+    # ------------------------------------------------------------
+    def push(self, action: dict[str, Any]) -> Optional[UndoRecord]:
+        spare = self._undo_pool.pop() if self._undo_pool else None
+        record = self.game_logic.apply_action_with_undo(action, spare)
+        if record is None:
+            if spare is not None:
+                self._undo_pool.append(spare)
+            return None
+
+        h = self.hash
+        for unit, prev_state in record.unit_states:
+            h ^= self._unit_key(unit.id, prev_state)
+            if unit.health > 0:
+                h ^= self._live_key(unit)
+
+        self._hash_stack.append(self.hash)
+        self.hash = h
+        return record
+
+    def pop(self, record: UndoRecord) -> None:
+        """Undo `record`; it is recycled and must not be used afterwards."""
+        self.game_logic.undo(record)
+        self.hash = self._hash_stack.pop()
+        self._undo_pool.append(record)
 
     def start_turn(self, team_id: int):
         self.game_logic.start_turn(team_id)
+        self.hash = self._full_hash()
 
     def get_legal_actions(self, team_id: int) -> list[dict[str, Any]]:
-        return self.game_logic.get_legal_actions(team_id)
+        """
+        Legal actions for the current position, cached by Zobrist hash.
+
+        Returns a fresh list (callers shuffle and sort it in place); the
+        action dicts inside are shared and must not be modified.
+        """
+        key = (self.hash, team_id)
+        legal = self._legal_cache.get(key)
+        if legal is None:
+            if len(self._legal_cache) >= TT_MAX_ENTRIES:
+                self._legal_cache.clear()
+            legal = self.game_logic.get_legal_actions(team_id)
+            self._legal_cache[key] = legal
+        return list(legal)
 
     def apply_action(self, action: dict[str, Any]) -> bool:
         ok = self.game_logic.apply_action(action)
+        self.hash = self._full_hash()
         return ok
 
     def check_turn_end(self, team_id: int) -> bool:
@@ -39,169 +134,542 @@ class _SimulationAPI:
         return self.game_board.get_snapshot()
 
 
+def _new_zobrist() -> tuple[dict[tuple, int], random.Random]:
+    """Empty Zobrist key table and the RNG its keys are drawn from."""
+    return {}, random.Random(0x5EED)
+
+
+def _evaluate_cached(
+    tt: dict[int, float],
+    sim: _SimulationAPI,
+    eval_fn: Callable[[dict[str, Any]], float],
+) -> float:
+    """
+    eval_fn(sim.snapshot()) memoized by the simulation's Zobrist hash.
+    """
+    score = tt.get(sim.hash)
+    if score is None:
+        if len(tt) >= TT_MAX_ENTRIES:
+            tt.clear()
+        score = eval_fn(sim.snapshot())
+        tt[sim.hash] = score
+    return score
+
+
+def _evaluate_batch(
+    tt: dict[int, float],
+    pending: dict[int, dict[str, Any]],
+    batch_eval_fn: Callable[[list[dict[str, Any]]], Any],
+) -> None:
+    """
+    Score every pending snapshot (Zobrist hash -> snapshot) with a single
+    batch_eval_fn call and store the results in the transposition table.
+    """
+    if not pending:
+        return
+    if len(tt) + len(pending) > TT_MAX_ENTRIES:
+        tt.clear()
+
+    scores = batch_eval_fn(list(pending.values()))
+    for key, score in zip(pending, scores):
+        tt[key] = float(score)
+
+
+def _hp_balance(snapshot: dict[str, Any], team_id: int) -> float:
+    """Own minus enemy total health: a cheap stand-in for eval_fn."""
+    balance = 0.0
+    for u in snapshot["units"]:
+        if u["team_id"] == team_id:
+            balance += u["health"]
+        else:
+            balance -= u["health"]
+    return balance
+
+
+def _prescore_filter(
+    pending: dict[int, dict[str, Any]], team_id: int, top_k: int
+) -> dict[int, dict[str, Any]]:
+    """
+    Keep the `top_k` pending snapshots with the best _hp_balance (all of them
+    if that heuristic cannot tell them apart).
+    """
+    if len(pending) <= top_k:
+        return pending
+
+    prescores = {key: _hp_balance(snap, team_id) for key, snap in pending.items()}
+    if len(set(prescores.values())) == 1:
+        return pending
+
+    keep = set(heapq.nlargest(top_k, prescores, key=prescores.__getitem__))
+    return {key: snap for key, snap in pending.items() if key in keep}
+
+
+def _partial_shuffle(items: list, k: int) -> list:
+    """
+    `k` random items of `items` in random order (all of them if fewer),
+    distributed like random.shuffle(items); items[:k]. `items` is reordered.
+
+    Runs only the first k steps of a Fisher-Yates shuffle when k is well
+    below len(items); otherwise a full shuffle costs about the same.
+    """
+    n = len(items)
+    if 2 * k >= n:
+        random.shuffle(items)
+        return items[:k]
+
+    randrange = random.randrange
+    for i in range(k):
+        j = randrange(i, n)
+        items[i], items[j] = items[j], items[i]
+    return items[:k]
+
+
+def _action_key(action: dict[str, Any]) -> tuple:
+    return (action["unit_id"], action["type"], action["target"])
+
+
+def _static_action_score(
+    board: GameState, action: dict[str, Any], enemies: list[tuple[int, int]]
+) -> float:
+    """
+    Cheap move-ordering prior: attack > move toward the nearest enemy >
+    other moves > wait.
+    """
+    kind = action["type"]
+    if kind == "attack":
+        return 3.0
+    if kind != "move" or not enemies:
+        return -1.0
+
+    unit = board.get_unit_by_id(action["unit_id"])
+    tx, ty = action["target"]
+    before = min(manhattan(unit.x, unit.y, ex, ey) for ex, ey in enemies)
+    after = min(manhattan(tx, ty, ex, ey) for ex, ey in enemies)
+    return 1.0 + (before - after)
+
+
+def _drop_dominated(
+    board: GameState,
+    team_id: int,
+    legal: list[dict[str, Any]],
+    enemies: list[tuple[int, int]],
+) -> list[dict[str, Any]]:
+    """
+    Forward pruning: drop a unit's wait while it can attack, and moves away
+    from the nearest enemy while our side is ahead on total health.
+
+    Each unit keeps at least its attacks or its wait, so the result is never
+    empty when `legal` is not.
+    """
+    attackers = {act["unit_id"] for act in legal if act["type"] == "attack"}
+    balance = 0
+    for u in board.units:
+        balance += u.health if u.team_id == team_id else -u.health
+    ahead = bool(enemies) and balance > 0
+
+    kept = []
+    for act in legal:
+        kind = act["type"]
+        if kind == "wait" and act["unit_id"] in attackers:
+            continue
+        if ahead and kind == "move":
+            # _static_action_score() is below 1.0 exactly for retreats
+            if _static_action_score(board, act, enemies) < 1.0:
+                continue
+        kept.append(act)
+    return kept
+
+
 class ActionPlannerReversible:
     def __init__(
         self,
         dfs_action_sets_limit: int,
         dfs_branching_limit: int,
         exploration_rate: float,
+        ordering_depth: int = 1,
+        prune_margin: Optional[float] = None,
+        prescore_top_k: Optional[int] = None,
+        prune_dominated: bool = False,
     ):
         self.dfs_action_sets_limit = dfs_action_sets_limit
         self.dfs_branching_limit = dfs_branching_limit
         self.exploration_rate = exploration_rate
+        # Iterative-deepening passes used to seed move ordering in plan()
+        self.ordering_depth = ordering_depth
+        # plan() skips a child whose eval + prune_margin cannot beat the best
+        # full turn found so far. None disables pruning (eval_fn gives no
+        # admissible bound, so any margin is a heuristic).
+        self.prune_margin = prune_margin
+        # plan() runs eval_fn only on the prescore_top_k leaves with the best
+        # own-minus-enemy HP balance. None evaluates every leaf.
+        self.prescore_top_k = prescore_top_k
+        # Branches skip dominated actions (see _drop_dominated()).
+        self.prune_dominated = prune_dominated
+
+        # Zobrist keys shared by every plan() simulation, so hashes from one
+        # turn still identify the same position on the next.
+        self._zobrist = _new_zobrist()
+        # Transposition tables per team: Zobrist hash -> eval_fn score. They
+        # persist across plan() calls on the same map (see clear_cache()).
+        self._tts: dict[int, dict[int, float]] = {}
+        self._tt_map: Optional[list] = None
+        self._tt: dict[int, float] = {}
+        # Move ordering: action key -> best eval seen below it last pass
+        self._ordering: dict[tuple, float] = {}
 
     # ------------------------------------------------------------
-    # Apply action with reversible state token
+    # Evaluation cache
     # ------------------------------------------------------------
-    def _apply_action_reversible(self, sim: SimulationAPI, action: dict):
-        board = sim.game_board
-        logic = sim.game_logic
-
-        restore = {
-            "unit_states": [],
-            "units_list": None,
-        }
-
-        # --------- MOVE ACTION ---------
-        if action["type"] == "move":
-            uid = action["unit_id"]
-            u = board.get_unit_by_id(uid)
-            if u is None:
-                return False, None
-
-            restore["unit_states"].append((u, (u.x, u.y, u.move_points, u.has_acted)))
-
-        # --------- ATTACK ACTION ---------
-        elif action["type"] == "attack":
-            aid = action["unit_id"]
-            did = action["target"]
-
-            attacker = board.get_unit_by_id(aid)
-            defender = board.get_unit_by_id(did)
-
-            if attacker is None or defender is None:
-                return False, None
-
-            restore["unit_states"].append(
-                (
-                    attacker,
-                    (
-                        attacker.x,
-                        attacker.y,
-                        attacker.health,
-                        attacker.has_attacked,
-                        attacker.has_acted,
-                    ),
-                )
-            )
-            restore["unit_states"].append(
-                (
-                    defender,
-                    (
-                        defender.x,
-                        defender.y,
-                        defender.health,
-                        defender.has_attacked,
-                        defender.has_acted,
-                    ),
-                )
-            )
-
-        # Save whole unit list (for restores after death)
-        restore["units_list"] = list(board.units)
-
-        ok = logic.apply_action(action)
-        return ok, restore
+    def clear_cache(self) -> None:
+        """
+        Forget cached evaluations. Call this whenever eval_fn changes
+        (e.g. a new brain); a new map clears the cache on its own.
+        """
+        self._zobrist = _new_zobrist()
+        self._tts.clear()
+        self._tt = {}
+
+    def _select_tt(self, game_board, team_id) -> None:
+        # Hashes cover the units only, so cached scores are valid only on
+        # the terrain they were computed for.
+        if game_board.tile_map is not self._tt_map or (
+            len(self._zobrist[0]) >= TT_MAX_ENTRIES
+        ):
+            self.clear_cache()
+            self._tt_map = game_board.tile_map
+
+        tt = self._tts.setdefault(team_id, {})
+        # Leave headroom so the table is never cleared mid-plan (the batch
+        # path reads leaf scores back from it).
+        if len(tt) >= TT_MAX_ENTRIES // 2:
+            tt.clear()
+        self._tt = tt
 
     # ------------------------------------------------------------
-    # Undo reversible change
+    # Move ordering
     # ------------------------------------------------------------
-    def _undo(self, sim: SimulationAPI, restore):
+    def _order_actions(self, sim, team_id, legal):
+        """
+        Keep the `dfs_branching_limit` most promising actions, best first.
+
+        With `prune_dominated`, dominated actions are dropped first. Actions
+        scored by the previous deepening pass come first (by score), the rest
+        follow by the static prior. Ties keep a random order, and
+        `exploration_rate` swaps a few pruned actions back in.
+        """
         board = sim.game_board
+        enemies = [(u.x, u.y) for u in board.units if u.team_id != team_id]
+        if self.prune_dominated:
+            legal = _drop_dominated(board, team_id, legal, enemies)
+        ordering = self._ordering
 
-        # Restore units' attributes
-        for unit, state in restore["unit_states"]:
-            if len(state) == 4:  # move
-                unit.x, unit.y, unit.move_points, unit.has_acted = state
-            else:  # attack
-                (unit.x, unit.y, unit.health, unit.has_attacked, unit.has_acted) = state
+        def sort_key(act):
+            score = ordering.get(_action_key(act))
+            if score is None:
+                return (False, _static_action_score(board, act, enemies))
+            return (True, score)
 
-        # Restore full unit list (dead units revived)
-        board.units = restore["units_list"]
+        random.shuffle(legal)
+        legal.sort(key=sort_key, reverse=True)
+
+        k = self.dfs_branching_limit
+        if self.exploration_rate > 0 and len(legal) > k:
+            for i in range(k):
+                if random.random() < self.exploration_rate:
+                    j = random.randrange(k, len(legal))
+                    legal[i], legal[j] = legal[j], legal[i]
+
+        return legal[:k]
+
+    def _deepen_ordering(self, team_id, sim, eval_fn):
+        """
+        Iterative deepening: pass d scores each action by the best eval found
+        within d plies below it, ordered by the scores of pass d - 1.
+        """
+        self._ordering = {}
+        for depth in range(1, self.ordering_depth + 1):
+            scores: dict[tuple, float] = {}
+            self._probe(team_id, sim, eval_fn, depth, scores)
+            self._ordering = scores
+
+    def _probe(self, team_id, sim, eval_fn, depth, scores) -> float:
+        if depth == 0 or sim.check_turn_end(team_id):
+            return _evaluate_cached(self._tt, sim, eval_fn)
+
+        legal = sim.get_legal_actions(team_id)
+        if not legal:
+            return _evaluate_cached(self._tt, sim, eval_fn)
+
+        best = float("-inf")
+        for act in self._order_actions(sim, team_id, legal):
+            record = sim.push(act)
+            if record is None:
+                continue
+
+            score = self._probe(team_id, sim, eval_fn, depth - 1, scores)
+            sim.pop(record)
+
+            key = _action_key(act)
+            if score > scores.get(key, float("-inf")):
+                scores[key] = score
+            if score > best:
+                best = score
+
+        return best
 
     # ------------------------------------------------------------
     # DFS recursion
     # ------------------------------------------------------------
-    def _dfs(self, team_id, sim, actions, out):
-        if len(out) >= self.dfs_action_sets_limit:
+    def _dfs(self, team_id, sim, actions, out, with_snapshots=False, seen=None):
+        """
+        Append every full turn below `sim` to `out` (with its end snapshot if
+        `with_snapshots`). With a `seen` set of Zobrist hashes, turns ending
+        in an already reached position are appended as None instead, so they
+        still count towards dfs_action_sets_limit.
+
+        Walks the tree with an explicit stack instead of recursion: `frames`
+        holds the remaining ordered actions of each open node on the current
+        path and `records` the undo records of the actions along it.
+        """
+        limit = self.dfs_action_sets_limit
+        push, pop = sim.push, sim.pop
+        frames = []
+        records = []
+
+        while True:
+            # Enter the current node: open it, or record it as a full turn
+            if len(out) < limit:
+                legal = None
+                if not sim.check_turn_end(team_id):
+                    legal = sim.get_legal_actions(team_id)
+
+                if legal:
+                    frames.append(iter(self._order_actions(sim, team_id, legal)))
+                elif seen is not None and sim.hash in seen:
+                    out.append(None)
+                else:
+                    if seen is not None:
+                        seen.add(sim.hash)
+                    if with_snapshots:
+                        out.append((actions[:], sim.snapshot()))
+                    else:
+                        out.append(actions[:])
+
+            # Step to the next child, backing out of finished nodes
+            while True:
+                if len(frames) == len(records):
+                    # Current node is finished: undo the action into it
+                    if not records:
+                        return
+                    pop(records.pop())
+                    actions.pop()
+                    if len(out) >= limit:
+                        frames.pop()
+                        continue
+
+                for act in frames[-1]:
+                    record = push(act)
+                    if record is not None:
+                        break
+                else:
+                    frames.pop()
+                    continue
+
+                records.append(record)
+                actions.append(act)
+                break
+
+    # ------------------------------------------------------------
+    # DFS fused with evaluation (plan)
+    # ------------------------------------------------------------
+    def _search(self, team_id, sim, actions, eval_fn, best):
+        """
+        Like _dfs, but scores each full turn as soon as it is reached and
+        keeps only the best one in `best` ({"score", "seq", "leaves"}).
+        """
+        if best["leaves"] >= self.dfs_action_sets_limit:
             return
 
-        if sim.check_turn_end(team_id):
-            out.append(actions[:])
+        legal = None
+        if not sim.check_turn_end(team_id):
+            legal = sim.get_legal_actions(team_id)
+
+        if not legal:
+            best["leaves"] += 1
+            score = _evaluate_cached(self._tt, sim, eval_fn)
+            if score > best["score"]:
+                best["score"] = score
+                best["seq"] = actions[:]
             return
 
-        legal = sim.get_legal_actions(team_id)
+        # Loop-invariant lookups bound once per node
+        margin = self.prune_margin
+        limit = self.dfs_action_sets_limit
+        push, pop, recurse = sim.push, sim.pop, self._search
+
+        for act in self._order_actions(sim, team_id, legal):
+            record = push(act)
+            if record is None:
+                continue
+
+            # Optimistic bound on this subtree: the child's eval plus margin
+            if margin is not None and (
+                _evaluate_cached(self._tt, sim, eval_fn) + margin <= best["score"]
+            ):
+                pop(record)
+                continue
+
+            actions.append(act)
+            recurse(team_id, sim, actions, eval_fn, best)
+            actions.pop()
+
+            pop(record)
+
+            if best["leaves"] >= limit:
+                break
+
+    def _collect_leaves(self, team_id, sim, actions, leaves, pending):
+        """
+        Like _dfs, but records (sequence, Zobrist hash) per full turn and the
+        snapshots of leaves not yet in the transposition table in `pending`.
+        """
+        if len(leaves) >= self.dfs_action_sets_limit:
+            return
+
+        legal = None
+        if not sim.check_turn_end(team_id):
+            legal = sim.get_legal_actions(team_id)
+
         if not legal:
-            out.append(actions[:])
+            leaves.append((actions[:], sim.hash))
+            if sim.hash not in self._tt and sim.hash not in pending:
+                pending[sim.hash] = sim.snapshot()
             return
 
-        random.shuffle(legal)
-        legal = legal[: self.dfs_branching_limit]
+        # Loop-invariant lookups bound once per node
+        limit = self.dfs_action_sets_limit
+        push, pop, recurse = sim.push, sim.pop, self._collect_leaves
 
-        for act in legal:
-            ok, token = self._apply_action_reversible(sim, act)
-            if not ok:
+        for act in self._order_actions(sim, team_id, legal):
+            record = push(act)
+            if record is None:
                 continue
 
             actions.append(act)
-            self._dfs(team_id, sim, actions, out)
+            recurse(team_id, sim, actions, leaves, pending)
             actions.pop()
 
-            self._undo(sim, token)
+            pop(record)
 
-            if len(out) >= self.dfs_action_sets_limit:
+            if len(leaves) >= limit:
                 break
 
     # ------------------------------------------------------------
     # Public planning entry
     # ------------------------------------------------------------
-    def plan(self, game_board, team_id, eval_fn):
-        sim = SimulationAPI(game_board.fast_clone())
+    def plan(self, game_board, team_id, eval_fn, batch_eval_fn=None):
+        """
+        Return the best full-turn action sequence for `team_id`.
+
+        `batch_eval_fn(snapshots) -> scores`, if given, scores all leaves in
+        one call instead of one eval_fn call each. It is not used with
+        prune_margin, which needs each score during the search; neither is
+        prescore_top_k.
+        """
+        self._select_tt(game_board, team_id)
+        sim = _SimulationAPI(game_board.fast_clone(), self._zobrist)
         sim.start_turn(team_id)
 
-        sequences = []
-        self._dfs(team_id, sim, [], sequences)
+        if self.exploration_rate > 0 and random.random() < self.exploration_rate:
+            self._ordering = {}
+            sequences = []
+            self._dfs(team_id, sim, [], sequences)
+            return random.choice(sequences) if sequences else []
+
+        self._deepen_ordering(team_id, sim, eval_fn)
+
+        top_k = self.prescore_top_k
+        if self.prune_margin is None and (
+            batch_eval_fn is not None or top_k is not None
+        ):
+            leaves = []
+            pending = {}
+            self._collect_leaves(team_id, sim, [], leaves, pending)
+            if top_k is not None:
+                pending = _prescore_filter(pending, team_id, top_k)
+            if batch_eval_fn is None:
+
+                def batch_eval_fn(snapshots):
+                    return [eval_fn(snap) for snap in snapshots]
+
+            _evaluate_batch(self._tt, pending, batch_eval_fn)
+
+            # Leaves filtered out by the prescore have no entry
+            tt = self._tt
+            best_seq, best_score = [], float("-inf")
+            for seq, key in leaves:
+                score = tt.get(key)
+                if score is not None and score > best_score:
+                    best_seq, best_score = seq, score
+            return best_seq
+
+        best = {"score": float("-inf"), "seq": [], "leaves": 0}
+        self._search(team_id, sim, [], eval_fn, best)
+        return best["seq"]
 
-        if not sequences:
-            return []
+    def plan_sequences(
+        self,
+        game_board,
+        team_id,
+        with_snapshots=False,
+        unique=False,
+    ):
+        """
+        Full-turn action sequences for `team_id` (no evaluation).
 
-        if self.exploration_rate > 0 and random.random() < self.exploration_rate:
-            return random.choice(sequences)
+        With `with_snapshots`, returns (sequence, snapshot) pairs instead,
+        the snapshot being the board at the end of the sequence as reached
+        by the DFS, so callers need not replay sequences to score them.
 
-        best = None
-        best_score = float("-inf")
+        With `unique`, only the first of several sequences ending in the same
+        position (e.g. independent moves in another order) is kept; the
+        dropped ones still count towards dfs_action_sets_limit, which keeps
+        bounding the search.
+        """
+        sim = _SimulationAPI(game_board.fast_clone())
+        sim.start_turn(team_id)
 
-        for seq in sequences:
-            replay_api = SimulationAPI(game_board.fast_clone())
-            replay_api.start_turn(team_id)
+        # No eval_fn here: order by the static prior only
+        self._ordering = {}
+        sequences = []
+        seen = set() if unique else None
+        self._dfs(team_id, sim, [], sequences, with_snapshots, seen)
+        return [seq for seq in sequences if seq is not None]
 
-            for act in seq:
-                replay_api.apply_action(act)
 
-            score = eval_fn(replay_api.get_board_snapshot())
-            if score > best_score:
-                best_score = score
-                best = seq
+def _replay(
+    sim: _SimulationAPI,
+    applied: list[tuple[dict[str, Any], Optional[UndoRecord]]],
+    seq: list[dict[str, Any]],
+) -> None:
+    """
+    Bring `sim` from the position after `applied` to the one after `seq`.
 
-        return best or []
+    Only the actions past the common prefix (matched by identity) are undone
+    and pushed; `applied` is updated in place.
+    """
+    common = 0
+    limit = min(len(applied), len(seq))
+    while common < limit and applied[common][0] is seq[common]:
+        common += 1
 
-    def plan_sequences(self, game_board, team_id):
-        sim = SimulationAPI(game_board.fast_clone())
-        sim.start_turn(team_id)
+    while len(applied) > common:
+        _, record = applied.pop()
+        if record is not None:
+            sim.pop(record)
 
-        sequences = []
-        self._dfs(team_id, sim, [], sequences)
-        return sequences
+    for act in seq[common:]:
+        applied.append((act, sim.push(act)))
 
 
 class ActionPlanner:
@@ -223,38 +691,56 @@ class ActionPlanner:
         self.dfs_branching_limit = dfs_branching_limit
         self.exploration_rate = exploration_rate
 
+        # Transposition table: Zobrist hash -> eval_fn score (per plan call)
+        self._tt: dict[int, float] = {}
+
     # ------------------------------------------
     # Internal DFS
     # ------------------------------------------
     def _dfs(
         self,
         team_id: int,
-        sim: SimulationAPI,
+        sim: _SimulationAPI,
         actions: list[dict[str, Any]],
-        out_sequences: list[list[dict[str, Any]]],
+        out_sequences: list[Optional[list[dict[str, Any]]]],
+        seen: set[int],
     ):
+        """
+        Append every full turn below `sim` to `out_sequences`. Turns ending
+        in a position already in `seen` (Zobrist hashes) are appended as None:
+        they would score the same, but still count towards
+        dfs_action_sets_limit.
+        """
         if len(out_sequences) >= self.dfs_action_sets_limit:
             return
 
-        if sim.check_turn_end(team_id):
-            out_sequences.append(actions)
-            return
-
-        legal = sim.get_legal_actions(team_id)
+        legal = None
+        if not sim.check_turn_end(team_id):
+            legal = sim.get_legal_actions(team_id)
         if not legal:
-            out_sequences.append(actions)
+            if sim.hash in seen:
+                out_sequences.append(None)
+            else:
+                seen.add(sim.hash)
+                out_sequences.append(actions[:])
             return
 
-        random.shuffle(legal)
-        legal = legal[: self.dfs_branching_limit]
+        legal = _partial_shuffle(legal, self.dfs_branching_limit)
+
+        # Loop-invariant lookups bound once per node
+        limit = self.dfs_action_sets_limit
+        push, pop, recurse = sim.push, sim.pop, self._dfs
 
         for act in legal:
-            if len(out_sequences) >= self.dfs_action_sets_limit:
+            if len(out_sequences) >= limit:
                 break
 
-            nxt = sim.clone()
-            if nxt.apply_action(act):
-                self._dfs(team_id, nxt, actions + [act], out_sequences)
+            record = push(act)
+            if record is not None:
+                actions.append(act)
+                recurse(team_id, sim, actions, out_sequences, seen)
+                actions.pop()
+                pop(record)
 
     # ------------------------------------------
     # Public API
@@ -265,12 +751,14 @@ class ActionPlanner:
         team_id: int,
         eval_fn: Callable[[dict[str, Any]], float],
     ) -> list[dict[str, Any]]:
-        base = SimulationAPI(game_board.fast_clone())
+        base = _SimulationAPI(game_board.fast_clone())
         base.start_turn(team_id)
 
-        sequences: list[list[dict[str, Any]]] = []
-        self._dfs(team_id, base, [], sequences)
+        found: list[Optional[list[dict[str, Any]]]] = []
+        self._dfs(team_id, base, [], found, set())
 
+        # Transposed turns (None) end in a position already listed
+        sequences = [seq for seq in found if seq is not None]
         if not sequences:
             return []
 
@@ -281,15 +769,15 @@ class ActionPlanner:
         # Evaluate
         best_score = float("-inf")
         best_seq: list[dict[str, Any]] = []
+        self._tt.clear()
 
-        for seq in sequences:
-            sim = SimulationAPI(game_board.fast_clone())
-            sim.start_turn(team_id)
-
-            for act in seq:
-                sim.apply_action(act)
+        # Consecutive DFS sequences share prefixes (the same action objects),
+        # so only the suffix after the common prefix is undone and replayed.
+        applied: list[tuple[dict[str, Any], Optional[UndoRecord]]] = []
 
-            score = eval_fn(sim.get_board_snapshot())
+        for seq in sequences:
+            _replay(base, applied, seq)
+            score = _evaluate_cached(self._tt, base, eval_fn)
             if score > best_score:
                 best_score = score
                 best_seq = seq
@@ -330,46 +818,50 @@ class BeamSearchPlannerFullTurn:
         the given game_board, completes the turn for `team_id`.
         """
 
-        # Initial simulation at start of this team's turn
-        root_sim = SimulationAPI(game_board.fast_clone())
-        root_sim.start_turn(team_id)
+        # One simulation for the whole search: each frontier node is reached
+        # by replaying its sequence (sharing prefixes, see _replay()) instead
+        # of keeping a cloned board per node.
+        sim = _SimulationAPI(game_board.fast_clone())
+        sim.start_turn(team_id)
+        applied: list[tuple[dict[str, Any], Optional[UndoRecord]]] = []
 
-        # frontier: list of (sim, seq, score)
+        # frontier: list of (seq, score)
         # score is evaluation of the *current* state after seq
-        initial_score = eval_fn(root_sim.get_board_snapshot())
-        frontier: list[tuple[SimulationAPI, list[dict[str, Any]], float]] = [
-            (root_sim, [], initial_score)
-        ]
+        initial_score = eval_fn(sim.snapshot())
+        frontier: list[tuple[list[dict[str, Any]], float]] = [([], initial_score)]
 
         finished: list[tuple[list[dict[str, Any]], float]] = []
 
         while frontier:
-            candidates: list[tuple[SimulationAPI, list[dict[str, Any]], float]] = []
+            # (parent seq, action, score after action)
+            candidates: list[tuple[list[dict[str, Any]], dict[str, Any], float]] = []
 
             # Expand all nodes in current frontier
-            for sim, seq, _ in frontier:
+            for seq, _ in frontier:
+                _replay(sim, applied, seq)
+
                 # Check if this sequence already ended the turn
                 if sim.check_turn_end(team_id):
-                    finished.append((seq, eval_fn(sim.get_board_snapshot())))
+                    finished.append((seq, eval_fn(sim.snapshot())))
                     continue
 
                 legal = sim.get_legal_actions(team_id)
                 if not legal:
                     # No moves → treat as finished sequence
-                    finished.append((seq, eval_fn(sim.get_board_snapshot())))
+                    finished.append((seq, eval_fn(sim.snapshot())))
                     continue
 
-                random.shuffle(legal)
-                legal = legal[: self.dfs_branching_limit]
+                legal = _partial_shuffle(legal, self.dfs_branching_limit)
 
+                # Score children in place on the parent
                 for act in legal:
-                    child_sim = sim.clone()
-                    if not child_sim.apply_action(act):
+                    record = sim.push(act)
+                    if record is None:
                         continue
 
-                    child_seq = seq + [act]
-                    score = eval_fn(child_sim.get_board_snapshot())
-                    candidates.append((child_sim, child_seq, score))
+                    score = eval_fn(sim.snapshot())
+                    sim.pop(record)
+                    candidates.append((seq, act, score))
 
             # No more candidates → all current frontier nodes were finished
             if not candidates:
@@ -377,11 +869,15 @@ class BeamSearchPlannerFullTurn:
 
             # Sort candidates (best first) and keep only top beam_width
             candidates.sort(key=lambda item: item[2], reverse=True)
-            frontier = candidates[: self.beam_width]
+
+            frontier = [
+                (seq + [act], score)
+                for seq, act, score in candidates[: self.beam_width]
+            ]
 
         # If we never produced a finished sequence, fall back to current frontier
         if not finished:
-            finished = [(seq, score) for (_sim, seq, score) in frontier]
+            finished = list(frontier)
 
         # Sort finished by score, best first, and return only action sequences
         finished.sort(key=lambda item: item[1], reverse=True)
@@ -15,6 +15,7 @@ from ai.utils.draft_helper import get_ai_draft_units
 from api.simulation_api import SimulationAPI
 from backend.board import GameState, create_random_map
 from utils.constants import UNIT_STATS, TeamType
+from utils.helpers import team_hp_and_alive
 from utils.path_utils import get_asset_path
 import configparser
 
@@ -23,17 +24,7 @@ import configparser
 # 🔍 Compute NEAT-style training stats
 # ======================================================================
 def _compute_neat_stats(sim: SimulationAPI, team1_names, team2_names):
-    snapshot = sim.get_board_snapshot()
-    units = snapshot["units"]
-
-    team1 = [u for u in units if u["team_id"] == 1]
-    team2 = [u for u in units if u["team_id"] == 2]
-
-    hp1 = sum(u["health"] for u in team1)
-    hp2 = sum(u["health"] for u in team2)
-
-    alive1 = len(team1)
-    alive2 = len(team2)
+    hp1, hp2, alive1, alive2 = team_hp_and_alive(sim.game_board.units)
 
     max_hp_team1 = sum(UNIT_STATS[n]["health"] for n in team1_names)
     max_hp_team2 = sum(UNIT_STATS[n]["health"] for n in team2_names)
@@ -1,4 +1,6 @@
 import random
+from bisect import bisect
+from itertools import accumulate
 
 from utils.constants import UNIT_STATS
 from utils.logging import logger
@@ -7,6 +9,8 @@ ProbMap = dict[str, float]
 StrategyMap = dict[str, ProbMap]
 UnitInfoMap = dict[str, dict[str, int]]  # e.g. {"Swordsman": {"cost": 30}, ...}
 
+STRATEGIES: tuple[str, ...] = ("balanced", "rush", "defense", "ranged")
+
 probabilities: StrategyMap = {
     "balanced": {"Swordsman": 0.25, "Archer": 0.25, "Horseman": 0.25, "Spearman": 0.25},
     "rush": {"Horseman": 0.5, "Swordsman": 0.3, "Archer": 0.1, "Spearman": 0.1},
@@ -21,49 +25,51 @@ def ai_draft_basic(
     probabilities: StrategyMap,
     max_picks: int,
 ) -> list[str]:
-    strategies: list[str] = ["balanced", "rush", "defense", "ranged"]
-    choice: str = random.choice(strategies)
+    choice: str = random.choice(STRATEGIES)
 
     logger.info(f"AI draft strategy chosen: {choice}")
 
     selected: list[str] = []
     funds_left: int = funds  # for example 100
 
+    # (unit, probability, cost) for units that exist and have non-zero
+    # probability. The cumulative weights of the affordable ones are only
+    # rebuilt when funds drop below the most expensive of them.
+    pool: list[tuple[str, float, int]] = [
+        (unit, prob, available_units[unit]["cost"])
+        for unit, prob in probabilities[choice].items()
+        if prob > 0 and unit in available_units
+    ]
+    cum_weights: list[float] = []
+    max_cost: int = 0
+    stale: bool = True
+
     picks_done: int = 0
     while picks_done < max_picks:
-        # filter units that exist, have non-zero probability and are affordable
-        affordable: ProbMap = {
-            unit: prob
-            for unit, prob in probabilities[choice].items()
-            if prob > 0
-            and unit in available_units
-            and available_units[unit]["cost"] <= funds_left
-        }
-
-        if not affordable:
-            break
-
-        # normalize weights
-        total: float = sum(affordable.values())
-        weights: list[float] = [prob / total for prob in affordable.values()]
-        units: list[str] = list(affordable.keys())
-
-        # choose one unit by weighted probability
-        chosen: str = random.choices(units, weights=weights, k=1)[0]
-        cost: int = available_units[chosen]["cost"]
-
-        # safety: if cost is zero, append once then remove it from
-        # future picks to avoid infinite loop
+        if stale:
+            pool = [entry for entry in pool if entry[2] <= funds_left]
+            if not pool:
+                break
+            cum_weights = list(accumulate(prob for _, prob, _ in pool))
+            max_cost = max(cost for _, _, cost in pool)
+            stale = False
+
+        # choose one unit by weighted probability (the same draw as
+        # random.choices(pool, cum_weights=cum_weights), minus its overhead)
+        r: float = random.random() * cum_weights[-1]
+        chosen, _, cost = pool[bisect(cum_weights, r, 0, len(pool) - 1)]
+
         selected.append(chosen)
         funds_left -= cost
         picks_done += 1
 
         if cost == 0:
-            # remove chosen unit from probabilities for
-            # this draft loop to avoid infinite picks
-            # make a shallow copy of the top-level map and the chosen strategy
-            probabilities = {k: dict(v) for k, v in probabilities.items()}  # type: ignore[assignment]
-            probabilities[choice].pop(chosen, None)
+            # safety: a free unit is picked once, then dropped from future
+            # picks to avoid an infinite loop
+            pool = [entry for entry in pool if entry[0] != chosen]
+            stale = True
+        elif funds_left < max_cost:
+            stale = True
 
     logger.info(f"AI draft completed. Units selected: {selected}")
 
@@ -1,35 +1,188 @@
 # /ai/utils/nn_utils.py
 
+from functools import lru_cache
 from math import hypot
-from typing import Any
+from operator import itemgetter
+from typing import Any, Optional
 
 import numpy as np
 
-from utils.constants import TERRAIN_DEFENSE_BONUS, TERRAIN_MOVE_COST, TileType, UnitType
-
-
-def _safe_mean(values):
-    return float(np.mean(values)) if values else 0.0
+from utils.constants import TERRAIN_DEFENSE_BONUS, TERRAIN_MOVE_COST, UnitType
+
+# Columns of the struct-of-arrays view of snapshot["units"]: the numeric unit
+# fields, then one 0/1 flag per unit type (composition order).
+SOA_FIELDS = (
+    "team_id",
+    "x",
+    "y",
+    "health",
+    "max_hp",
+    "armor",
+    "attack_power",
+    "attack_range",
+    "move_points",
+    "has_attacked",
+)
+_COMP_TYPES = (
+    UnitType.SWORDSMAN.value,
+    UnitType.ARCHER.value,
+    UnitType.HORSEMAN.value,
+    UnitType.SPEARMAN.value,
+)
+SOA_COLUMNS = SOA_FIELDS + _COMP_TYPES
+
+(
+    _TEAM,
+    _X,
+    _Y,
+    _HP,
+    _MAX_HP,
+    _ARMOR,
+    _ATTACK,
+    _RANGE,
+    _MOVE_PTS,
+    _ATTACKED,
+) = range(len(SOA_FIELDS))
+_COMP = slice(len(SOA_FIELDS), len(SOA_COLUMNS))
+
+_get_fields = itemgetter(*SOA_FIELDS)
+
+# Last tile map seen by _terrain_grids and the grids built from it.
+_tile_cache: list[Any] = [None, None]
 
 
 def _safe_div(a, b):
     return a / b if b > 0 else 0.0
 
 
-def _unit_dist(u1, u2):
-    return float(hypot(u1["x"] - u2["x"], u1["y"] - u2["y"]))
+def _mean(values: list) -> float:
+    # Scalar mean for the handful of units per team (np.mean's dispatch costs
+    # far more than the sum); empty input gives nan, like np.mean.
+    return sum(values) / len(values) if values else float("nan")
+
+
+@lru_cache(maxsize=None)
+def _feature_scales(max_dim: float, unit_hp_pct: bool) -> np.ndarray:
+    """
+    Per-feature normalization factors (reciprocals) for _encode, which fills
+    raw values and scales them all with one in-place multiply.
+    """
+    inv_dim = 1.0 / max_dim
+    inv_cost = 1.0 / (max(TERRAIN_MOVE_COST.values()) or 1)
+
+    scales = (
+        [1.0]  # team_id
+        + [1.0] * (5 if unit_hp_pct else 3)  # HP global
+        + [1.0] * 8  # composition
+        + [0.1, 0.1, 1.0, 1.0]  # mobility & action state
+        + [inv_dim, 1.0, 0.01, 1.0, 1.0]  # closest enemy
+        + [0.1, 0.1]  # local densities
+        + [inv_cost, inv_cost, 1.0, 1.0]  # terrain
+        + [inv_dim] * 7  # formation
+        + [0.01, 1.0 / 150.0, inv_dim, 1.0]  # best attack
+    )
+    scales = np.array(scales, dtype=np.float32)
+    scales.flags.writeable = False
+    return scales
 
 
-def _count_type(units, unit_type_value: str):
-    return sum(1 for u in units if unit_type_value.lower() in str(u["name"]).lower())
+@lru_cache(maxsize=None)
+def _type_flags(name: str) -> tuple[bool, ...]:
+    lowered = str(name).lower()
+    return tuple(t.lower() in lowered for t in _COMP_TYPES)
 
 
-def encode_state(game_state: dict[str, Any], team_id: int) -> np.ndarray:
-    units = game_state["units"]
+def _unit_matrix(units: list[dict[str, Any]]) -> np.ndarray:
+    """(N, len(SOA_COLUMNS)) float64 matrix, one row per unit."""
+    return np.array(
+        [_get_fields(u) + _type_flags(u["name"]) for u in units],
+        dtype=np.float64,
+    ).reshape(-1, len(SOA_COLUMNS))
+
+
+def snapshot_arrays(game_state: dict[str, Any]) -> dict[str, np.ndarray]:
+    """
+    Struct-of-arrays view of snapshot["units"]: one float64 column per name
+    in SOA_COLUMNS (unit type columns hold 0/1 flags).
+    """
+    matrix = _unit_matrix(game_state["units"])
+    return {key: matrix[:, i] for i, key in enumerate(SOA_COLUMNS)}
+
+
+def _terrain_grids(tiles) -> np.ndarray:
+    """
+    (3, H, W) per-tile terrain lookups, rebuilt only when the tile map object
+    changes:
+    - 0: 3x3 sum of passable move costs around the tile
+    - 1: 3x3 count of passable tiles around the tile
+    - 2: defense bonus of the tile
+    """
+    if _tile_cache[0] is tiles:
+        return _tile_cache[1]
+
+    cost = np.array(
+        [[float(TERRAIN_MOVE_COST[t]) for t in row] for row in tiles],
+        dtype=np.float64,
+    )
+    defense = np.array(
+        [[float(TERRAIN_DEFENSE_BONUS[t]) for t in row] for row in tiles],
+        dtype=np.float64,
+    )
+
+    h, w = cost.shape
+    passable = cost < 9999
+
+    padded = np.zeros((2, h + 2, w + 2))
+    padded[0, 1:-1, 1:-1] = np.where(passable, cost, 0.0)
+    padded[1, 1:-1, 1:-1] = passable
+
+    grids = np.zeros((3, h, w))
+    for dy in (0, 1, 2):
+        for dx in (0, 1, 2):
+            grids[:2] += padded[:, dy : dy + h, dx : dx + w]
+    grids[2] = defense
+
+    _tile_cache[0] = tiles
+    _tile_cache[1] = grids
+    return grids
+
+
+def _team_stats(units: np.ndarray, ally_mask: np.ndarray, grids: np.ndarray):
+    """
+    Column sums, summed terrain lookups at the units' tiles and summed
+    per-unit HP% for the ally and enemy groups, reduced for both at once by
+    multiplying with the (2, N) group membership matrix.
+
+    Each result is a pair (ally, enemy) of Python values; the scalar feature
+    math downstream is slower on numpy scalars.
+    """
+    groups = np.stack((ally_mask, ~ally_mask)).astype(np.float64)
+    sums = groups @ units
+    iy = units[:, _Y].astype(np.intp)
+    ix = units[:, _X].astype(np.intp)
+    terrain = groups @ grids[:, iy, ix].T
+    hp_pct = groups @ (units[:, _HP] / units[:, _MAX_HP])
+    return sums.tolist(), terrain.tolist(), hp_pct.tolist()
+
+
+def _encode(
+    game_state: dict[str, Any],
+    team_id: int,
+    unit_hp_pct: bool,
+    out: Optional[np.ndarray],
+) -> np.ndarray:
+    """
+    Shared body of encode_state / encode_state_old, vectorized over the
+    struct-of-arrays view of the units.
+
+    `unit_hp_pct` adds the per-unit average HP% pair used by encode_state_old.
+    """
     tiles = game_state["tiles"]
+    units = _unit_matrix(game_state["units"])
 
-    ally = [u for u in units if u["team_id"] == team_id]
-    enemy = [u for u in units if u["team_id"] != team_id]
+    ally_mask = units[:, _TEAM] == team_id
+    ally = units[ally_mask]
+    enemy = units[~ally_mask]
 
     n_ally = len(ally)
     n_enemy = len(enemy)
@@ -41,159 +194,87 @@ def encode_state(game_state: dict[str, Any], team_id: int) -> np.ndarray:
     board_w = len(tiles[0]) if board_h > 0 else 1
     max_dim = float(max(board_w, board_h, 1))
 
-    def _dist(a, b) -> float:
-        return float(hypot(a["x"] - b["x"], a["y"] - b["y"]))
-
-    def _terrain_move_cost(x: int, y: int) -> float:
-        if 0 <= y < board_h and 0 <= x < board_w:
-            tile: TileType = tiles[y][x]
-            return float(TERRAIN_MOVE_COST[tile])
-        return 9999.0
+    grids = _terrain_grids(tiles)
+    (a_sum, e_sum), (a_terrain, e_terrain), (a_hp_pct, e_hp_pct) = _team_stats(
+        units, ally_mask, grids
+    )
 
-    def _terrain_def_bonus(u: dict[str, Any]) -> float:
-        tile: TileType = tiles[u["y"]][u["x"]]
-        return float(TERRAIN_DEFENSE_BONUS[tile])
+    a_n = n_ally or 1
+    e_n = n_enemy or 1
 
     # ------------------------------------------------------------------
-    # 1. Global HP / mobility (similar to your original)
+    # 1. Global HP / mobility
     # ------------------------------------------------------------------
-    ally_hp = sum(u["health"] for u in ally)
-    enemy_hp = sum(u["health"] for u in enemy)
-
-    ally_max_hp = sum(u["max_hp"] for u in ally)
-    enemy_max_hp = sum(u["max_hp"] for u in enemy)
-
-    ally_hp_pct = _safe_div(ally_hp, ally_max_hp)
-    enemy_hp_pct = _safe_div(enemy_hp, enemy_max_hp)
+    ally_hp_pct = _safe_div(a_sum[_HP], a_sum[_MAX_HP])
+    enemy_hp_pct = _safe_div(e_sum[_HP], e_sum[_MAX_HP])
     hp_advantage = ally_hp_pct - enemy_hp_pct
 
-    avg_move_pts_ally = _safe_mean([u["move_points"] for u in ally]) / 10.0
-    avg_move_pts_enemy = _safe_mean([u["move_points"] for u in enemy]) / 10.0
+    avg_hp_pct_ally = a_hp_pct / a_n
+    avg_hp_pct_enemy = e_hp_pct / e_n
+
+    avg_move_pts_ally = a_sum[_MOVE_PTS] / a_n
+    avg_move_pts_enemy = e_sum[_MOVE_PTS] / e_n
 
-    frac_ally_can_attack = _safe_mean([1 - int(u["has_attacked"]) for u in ally])
-    frac_enemy_can_attack = _safe_mean([1 - int(u["has_attacked"]) for u in enemy])
+    frac_ally_can_attack = (n_ally - a_sum[_ATTACKED]) / a_n
+    frac_enemy_can_attack = (n_enemy - e_sum[_ATTACKED]) / e_n
 
     # ------------------------------------------------------------------
-    # 2. Composition (keep your original idea)
+    # 2. Composition
     # ------------------------------------------------------------------
-    ally_sword = _count_type(ally, UnitType.SWORDSMAN.value)
-    ally_arch = _count_type(ally, UnitType.ARCHER.value)
-    ally_horse = _count_type(ally, UnitType.HORSEMAN.value)
-    ally_spear = _count_type(ally, UnitType.SPEARMAN.value)
-
-    enemy_sword = _count_type(enemy, UnitType.SWORDSMAN.value)
-    enemy_arch = _count_type(enemy, UnitType.ARCHER.value)
-    enemy_horse = _count_type(enemy, UnitType.HORSEMAN.value)
-    enemy_spear = _count_type(enemy, UnitType.SPEARMAN.value)
-
-    comp = [
-        _safe_div(ally_sword, n_ally),
-        _safe_div(ally_arch, n_ally),
-        _safe_div(ally_horse, n_ally),
-        _safe_div(ally_spear, n_ally),
-        _safe_div(enemy_sword, n_enemy),
-        _safe_div(enemy_arch, n_enemy),
-        _safe_div(enemy_horse, n_enemy),
-        _safe_div(enemy_spear, n_enemy),
-    ]
+    comp = (*(v / a_n for v in a_sum[_COMP]), *(v / e_n for v in e_sum[_COMP]))
 
     # ------------------------------------------------------------------
     # 3. Per-unit tactical / local info
     # ------------------------------------------------------------------
-    # closest enemy, can I hit, can they hit?
-    def _closest_enemy_info_for_unit(u):
-        if not enemy:
-            return (1.0, 0.0, 0.0, 0.0, 0.0)
-
-        dists = [(_dist(u, e), e) for e in enemy]
-        d, e = min(dists, key=lambda x: x[0])
-
-        d_norm = d / max_dim
-        enemy_hp_pct = _safe_div(e["health"], e["max_hp"])
-        enemy_armor_norm = e["armor"] / 100.0
-
-        in_my_range = 1.0 if d <= u["attack_range"] else 0.0
+    ax, ay = ally[:, _X], ally[:, _Y]
+    ex, ey = enemy[:, _X], enemy[:, _Y]
 
-        threatened = 0.0
-        for en in enemy:
-            if _dist(u, en) <= en["attack_range"]:
-                threatened = 1.0
-                break
+    # (ally, enemy) distances
+    dist = np.hypot(ax[:, None] - ex, ay[:, None] - ey)
 
-        return (d_norm, enemy_hp_pct, enemy_armor_norm, in_my_range, threatened)
+    # closest enemy, can I hit, can they hit? (averaged over allies)
+    if n_ally and n_enemy:
+        nearest = dist.argmin(axis=1)
+        d = dist[np.arange(n_ally), nearest]
+        target = enemy[nearest]
 
-    if ally:
-        arr = np.array(
-            [_closest_enemy_info_for_unit(u) for u in ally], dtype=np.float32
+        closest_enemy_info = (
+            d.sum() / n_ally,
+            (target[:, _HP] / target[:, _MAX_HP]).sum() / n_ally,
+            target[:, _ARMOR].sum() / n_ally,
+            np.count_nonzero(d <= ally[:, _RANGE]) / n_ally,
+            np.count_nonzero((dist <= enemy[:, _RANGE]).any(axis=1)) / n_ally,
         )
-        closest_enemy_info = arr.mean(axis=0)
+    elif n_ally:
+        closest_enemy_info = (max_dim, 0.0, 0.0, 0.0, 0.0)
     else:
-        closest_enemy_info = np.zeros(5, dtype=np.float32)
+        closest_enemy_info = (0.0, 0.0, 0.0, 0.0, 0.0)
 
-    # local ally / enemy density around allies (radius 3)
-    def _nearby_count(u, group, radius: float) -> int:
-        return sum(1 for o in group if o is not u and _dist(u, o) <= radius)
-
-    if ally:
-        ally_density = _safe_mean([_nearby_count(a, ally, 3.0) for a in ally])
-        enemy_density = _safe_mean([_nearby_count(a, enemy, 3.0) for a in ally])
-    else:
-        ally_density = 0.0
-        enemy_density = 0.0
-
-    ally_density_norm = ally_density / 10.0
-    enemy_density_norm = enemy_density / 10.0
+    # local ally / enemy density around allies (radius 3); every ally is
+    # within range of itself, hence the n_ally correction
+    ally_dist = np.hypot(ax[:, None] - ax, ay[:, None] - ay)
+    ally_density = (np.count_nonzero(ally_dist <= 3.0) - n_ally) / a_n
+    enemy_density = np.count_nonzero(dist <= 3.0) / a_n
 
     # ------------------------------------------------------------------
-    # 4. Terrain influence (using your TILE / TERRAIN_* constants)
+    # 4. Terrain influence
     # ------------------------------------------------------------------
-    def _avg_local_move_cost(group):
-        vals: list[float] = []
-        for u in group:
-            for dy in (-1, 0, 1):
-                for dx in (-1, 0, 1):
-                    x = u["x"] + dx
-                    y = u["y"] + dy
-                    c = _terrain_move_cost(x, y)
-                    if c < 9999:
-                        vals.append(c)
-        return _safe_mean(vals)
-
-    ally_move_cost = _avg_local_move_cost(ally)
-    enemy_move_cost = _avg_local_move_cost(enemy)
-
-    max_move_cost = max(TERRAIN_MOVE_COST.values()) or 1
-    ally_move_cost_norm = ally_move_cost / max_move_cost
-    enemy_move_cost_norm = enemy_move_cost / max_move_cost
-
-    ally_def_bonus = _safe_mean([_terrain_def_bonus(u) for u in ally])
-    enemy_def_bonus = _safe_mean([_terrain_def_bonus(u) for u in enemy])
+    ally_move_cost = _safe_div(a_terrain[0], a_terrain[1])
+    enemy_move_cost = _safe_div(e_terrain[0], e_terrain[1])
+
+    ally_def_bonus = a_terrain[2] / a_n
+    enemy_def_bonus = e_terrain[2] / e_n
 
     # ------------------------------------------------------------------
     # 5. Formation / spacing
     # ------------------------------------------------------------------
-    def _center(group):
-        if not group:
-            return (0.0, 0.0)
-        return (
-            _safe_mean([u["x"] for u in group]) / max_dim,
-            _safe_mean([u["y"] for u in group]) / max_dim,
-        )
-
-    acx, acy = _center(ally)
-    ecx, ecy = _center(enemy)
+    acx, acy = a_sum[_X] / a_n, a_sum[_Y] / a_n
+    ecx, ecy = e_sum[_X] / e_n, e_sum[_Y] / e_n
 
-    center_distance = hypot(acx - ecx, acy - ecy)  # already normalized
+    center_distance = hypot(acx - ecx, acy - ecy)
 
-    def _dispersion(group, cx, cy):
-        if not group:
-            return 0.0
-        return _safe_mean(
-            [hypot(u["x"] / max_dim - cx, u["y"] / max_dim - cy) for u in group]
-        )
-
-    ally_dispersion = _dispersion(ally, acx, acy)
-    enemy_dispersion = _dispersion(enemy, ecx, ecy)
+    ally_dispersion = np.hypot(ax - acx, ay - acy).sum() / a_n
+    enemy_dispersion = np.hypot(ex - ecx, ey - ecy).sum() / e_n
 
     # ------------------------------------------------------------------
     # 6. Best attack opportunity (focus fire / kill shots)
@@ -203,34 +284,34 @@ def encode_state(game_state: dict[str, Any], team_id: int) -> np.ndarray:
     best_target_dist = max_dim
     can_kill = 0.0
 
-    if ally and enemy:
-        for a in ally:
-            for e in enemy:
-                d = _dist(a, e)
-                # rough estimate; you might refine with EFFECTIVENESS
-                estimated = a["attack_power"] - e["armor"] * 0.3
-                if estimated <= 0:
-                    continue
-                if estimated > best_damage:
-                    best_damage = estimated
-                    best_target_hp = float(e["health"])
-                    best_target_dist = d
-                    can_kill = 1.0 if estimated >= e["health"] else 0.0
-
-    best_damage_norm = best_damage / 100.0
-    best_target_hp_norm = best_target_hp / 150.0
-    best_target_dist_norm = best_target_dist / max_dim if max_dim > 0 else 0.0
+    if n_ally and n_enemy:
+        # rough estimate; the first (ally, enemy) pair wins ties
+        estimated = ally[:, _ATTACK, None] - enemy[:, _ARMOR] * 0.3
+        i, j = divmod(int(estimated.argmax()), n_enemy)
+        if estimated[i, j] > 0:
+            best_damage = estimated[i, j]
+            best_target_hp = enemy[j, _HP]
+            best_target_dist = dist[i, j]
+            can_kill = 1.0 if best_damage >= best_target_hp else 0.0
+
+    # ------------------------------------------------------------------
+    # FINAL FEATURE VECTOR (raw; scaled by _feature_scales below)
+    # ------------------------------------------------------------------
+    if unit_hp_pct:
+        hp_block = (
+            ally_hp_pct,
+            enemy_hp_pct,
+            hp_advantage,
+            avg_hp_pct_ally,
+            avg_hp_pct_enemy,
+        )
+    else:
+        hp_block = (ally_hp_pct, enemy_hp_pct, hp_advantage)
 
-    # ------------------------------------------------------------------
-    # FINAL FEATURE VECTOR
-    # ------------------------------------------------------------------
-    # 30 features + comp(8)
-    features = [
+    features = (
         float(team_id),
         # HP global
-        ally_hp_pct,
-        enemy_hp_pct,
-        hp_advantage,
+        *hp_block,
         # Composition
         *comp,
         # Mobility & action state
@@ -239,17 +320,13 @@ def encode_state(game_state: dict[str, Any], team_id: int) -> np.ndarray:
         frac_ally_can_attack,
         frac_enemy_can_attack,
         # Closest enemy tactical info (averaged over allies)
-        closest_enemy_info[0],  # avg distance to closest enemy (normalized)
-        closest_enemy_info[1],  # avg closest enemy HP%
-        closest_enemy_info[2],  # avg closest enemy armor
-        closest_enemy_info[3],  # fraction of allies that have someone in range
-        closest_enemy_info[4],  # fraction threatened by enemy in range
+        *closest_enemy_info,
         # Local densities
-        ally_density_norm,
-        enemy_density_norm,
+        ally_density,
+        enemy_density,
         # Terrain context
-        ally_move_cost_norm,
-        enemy_move_cost_norm,
+        ally_move_cost,
+        enemy_move_cost,
         ally_def_bonus,
         enemy_def_bonus,
         # Formation
@@ -261,266 +338,226 @@ def encode_state(game_state: dict[str, Any], team_id: int) -> np.ndarray:
         ally_dispersion,
         enemy_dispersion,
         # Best attack opportunity
-        best_damage_norm,
-        best_target_hp_norm,
-        best_target_dist_norm,
+        best_damage,
+        best_target_hp,
+        best_target_dist,
         can_kill,
-    ]
-
-    return np.array(features, dtype=np.float32)
-
-
-def encode_state_old(game_state: dict[str, Any], team_id: int) -> np.ndarray:
-    units = game_state["units"]
-    tiles = game_state["tiles"]
-
-    ally = [u for u in units if u["team_id"] == team_id]
-    enemy = [u for u in units if u["team_id"] != team_id]
+    )
 
-    n_ally = len(ally)
-    n_enemy = len(enemy)
+    if out is None:
+        out = np.array(features, dtype=np.float32)
+    else:
+        out[:] = features
+
+    np.multiply(out, _feature_scales(max_dim, unit_hp_pct), out=out)
+    return out
+
+
+def _padded_units(snapshots: list[dict[str, Any]]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (B, U, len(SOA_COLUMNS)) unit matrices of B snapshots, padded to the
+    largest unit count U, and the (B, U) mask of real rows. Padding rows are
+    zero except max_hp (1), so per-unit ratios stay finite; U is at least 1.
+    """
+    counts = [len(snap["units"]) for snap in snapshots]
+    flat = _unit_matrix([u for snap in snapshots for u in snap["units"]])
+
+    valid = np.arange(max(1, *counts)) < np.array(counts)[:, None]
+    units = np.zeros(valid.shape + (len(SOA_COLUMNS),))
+    units[:, :, _MAX_HP] = 1.0
+    units[valid] = flat
+    return units, valid
+
+
+def _encode_batch(
+    snapshots: list[dict[str, Any]],
+    team_id: int,
+    unit_hp_pct: bool,
+    out: Optional[np.ndarray],
+) -> np.ndarray:
+    """
+    _encode for many snapshots at once: every feature is computed for the
+    whole batch with masked operations on the padded unit matrices, so the
+    per-call overhead of the small NumPy ops is paid once per batch.
+
+    Snapshots must share one tile map (true for leaves of a single search);
+    otherwise they are encoded one by one.
+    """
+    n_features = 40 if unit_hp_pct else 38
+    if out is None:
+        out = np.empty((len(snapshots), n_features), dtype=np.float32)
+    if not snapshots:
+        return out
+
+    tiles = snapshots[0]["tiles"]
+    if any(snap["tiles"] is not tiles for snap in snapshots):
+        for row, snap in zip(out, snapshots):
+            _encode(snap, team_id, unit_hp_pct, out=row)
+        return out
+
+    units, valid = _padded_units(snapshots)
+    ally = valid & (units[:, :, _TEAM] == team_id)
+    enemy = valid & ~ally
+    ally_f = ally.astype(np.float64)
+    enemy_f = enemy.astype(np.float64)
+
+    n_ally = ally_f.sum(axis=1)
+    n_enemy = enemy_f.sum(axis=1)
+    a_n = np.maximum(n_ally, 1.0)
+    e_n = np.maximum(n_enemy, 1.0)
+    both = (n_ally > 0) & (n_enemy > 0)
 
-    # ------------------------------------------------------------------
-    # Board size & normalization helpers
-    # ------------------------------------------------------------------
     board_h = len(tiles)
     board_w = len(tiles[0]) if board_h > 0 else 1
     max_dim = float(max(board_w, board_h, 1))
 
-    def _dist(a, b) -> float:
-        return float(hypot(a["x"] - b["x"], a["y"] - b["y"]))
-
-    def _terrain_move_cost(x: int, y: int) -> float:
-        if 0 <= y < board_h and 0 <= x < board_w:
-            tile: TileType = tiles[y][x]
-            return float(TERRAIN_MOVE_COST[tile])
-        return 9999.0
-
-    def _terrain_def_bonus(u: dict[str, Any]) -> float:
-        tile: TileType = tiles[u["y"]][u["x"]]
-        return float(TERRAIN_DEFENSE_BONUS[tile])
-
-    # ------------------------------------------------------------------
-    # 1. Global HP / mobility (similar to your original)
-    # ------------------------------------------------------------------
-    ally_hp = sum(u["health"] for u in ally)
-    enemy_hp = sum(u["health"] for u in enemy)
-
-    ally_max_hp = sum(u["max_hp"] for u in ally)
-    enemy_max_hp = sum(u["max_hp"] for u in enemy)
-
-    ally_hp_pct = _safe_div(ally_hp, ally_max_hp)
-    enemy_hp_pct = _safe_div(enemy_hp, enemy_max_hp)
-    hp_advantage = ally_hp_pct - enemy_hp_pct
-
-    avg_hp_pct_ally = _safe_mean([u["health"] / u["max_hp"] for u in ally])
-    avg_hp_pct_enemy = _safe_mean([u["health"] / u["max_hp"] for u in enemy])
-
-    # TODO: mozgasi hatotav pontok helyett
-    avg_move_pts_ally = _safe_mean([u["move_points"] for u in ally]) / 10.0
-    avg_move_pts_enemy = _safe_mean([u["move_points"] for u in enemy]) / 10.0
+    def safe_div(a, b):
+        return np.where(b > 0, a / np.where(b > 0, b, 1.0), 0.0)
+
+    # Group sums (B, C) and per-unit lookups (B, U)
+    a_sum = np.einsum("bu,buc->bc", ally_f, units)
+    e_sum = np.einsum("bu,buc->bc", enemy_f, units)
+    x, y = units[:, :, _X], units[:, :, _Y]
+    hp = units[:, :, _HP]
+    unit_hp = hp / units[:, :, _MAX_HP]
+    terrain = _terrain_grids(tiles)[:, y.astype(np.intp), x.astype(np.intp)]
+    a_terrain = (terrain * ally_f).sum(axis=2)
+    e_terrain = (terrain * enemy_f).sum(axis=2)
+
+    # 1. Global HP / mobility
+    ally_hp_pct = safe_div(a_sum[:, _HP], a_sum[:, _MAX_HP])
+    enemy_hp_pct = safe_div(e_sum[:, _HP], e_sum[:, _MAX_HP])
+
+    # 3. Per-unit tactical / local info on (B, U, U) unit pairs
+    dist = np.hypot(x[:, :, None] - x[:, None, :], y[:, :, None] - y[:, None, :])
+    ally_enemy = ally[:, :, None] & enemy[:, None, :]
+
+    nearest = np.where(ally_enemy, dist, np.inf).argmin(axis=2)
+    d = np.take_along_axis(dist, nearest[:, :, None], axis=2)[:, :, 0]
+    target_hp = np.take_along_axis(unit_hp, nearest, axis=1)
+    target_armor = np.take_along_axis(units[:, :, _ARMOR], nearest, axis=1)
+    in_range = d <= units[:, :, _RANGE]
+    threatened = (ally_enemy & (dist <= units[:, None, :, _RANGE])).any(axis=2)
+
+    closest = np.stack(
+        (
+            (d * ally_f).sum(axis=1),
+            (target_hp * ally_f).sum(axis=1),
+            (target_armor * ally_f).sum(axis=1),
+            (in_range & ally).sum(axis=1),
+            (threatened & ally).sum(axis=1),
+        ),
+        axis=1,
+    )
+    closest /= a_n[:, None]
+    no_enemy = np.array([max_dim, 0.0, 0.0, 0.0, 0.0])
+    closest = np.where(
+        both[:, None], closest, np.where(n_ally[:, None] > 0, no_enemy, 0.0)
+    )
 
-    # TODO: ez nem is kell
-    frac_ally_can_attack = _safe_mean([1 - int(u["has_attacked"]) for u in ally])
-    frac_enemy_can_attack = _safe_mean([1 - int(u["has_attacked"]) for u in enemy])
+    near = dist <= 3.0
+    ally_ally = ally[:, :, None] & ally[:, None, :]
+    ally_density = ((near & ally_ally).sum(axis=(1, 2)) - n_ally) / a_n
+    enemy_density = (near & ally_enemy).sum(axis=(1, 2)) / a_n
 
-    # ------------------------------------------------------------------
-    # 2. Composition (keep your original idea)
-    # ------------------------------------------------------------------
-    ally_sword = _count_type(ally, UnitType.SWORDSMAN.value)
-    ally_arch = _count_type(ally, UnitType.ARCHER.value)
-    ally_horse = _count_type(ally, UnitType.HORSEMAN.value)
-    ally_spear = _count_type(ally, UnitType.SPEARMAN.value)
-
-    enemy_sword = _count_type(enemy, UnitType.SWORDSMAN.value)
-    enemy_arch = _count_type(enemy, UnitType.ARCHER.value)
-    enemy_horse = _count_type(enemy, UnitType.HORSEMAN.value)
-    enemy_spear = _count_type(enemy, UnitType.SPEARMAN.value)
-
-    comp = [
-        _safe_div(ally_sword, n_ally),
-        _safe_div(ally_arch, n_ally),
-        _safe_div(ally_horse, n_ally),
-        _safe_div(ally_spear, n_ally),
-        _safe_div(enemy_sword, n_enemy),
-        _safe_div(enemy_arch, n_enemy),
-        _safe_div(enemy_horse, n_enemy),
-        _safe_div(enemy_spear, n_enemy),
+    # 5. Formation / spacing
+    acx, acy = a_sum[:, _X] / a_n, a_sum[:, _Y] / a_n
+    ecx, ecy = e_sum[:, _X] / e_n, e_sum[:, _Y] / e_n
+    ally_spread = np.hypot(x - acx[:, None], y - acy[:, None]) * ally_f
+    enemy_spread = np.hypot(x - ecx[:, None], y - ecy[:, None]) * enemy_f
+
+    # 6. Best attack opportunity; the first (ally, enemy) pair wins ties
+    n_slots = units.shape[1]
+    estimated = units[:, :, _ATTACK, None] - units[:, None, :, _ARMOR] * 0.3
+    estimated = np.where(ally_enemy, estimated, -np.inf).reshape(len(units), -1)
+    i, j = np.divmod(estimated.argmax(axis=1), n_slots)
+    rows = np.arange(len(units))
+    best_damage = estimated[rows, i * n_slots + j]
+    hit = both & (best_damage > 0)
+    best_target_hp = hp[rows, j]
+
+    # Final feature matrix (raw; scaled by _feature_scales below)
+    columns = [np.full(len(units), float(team_id)), ally_hp_pct, enemy_hp_pct]
+    columns.append(ally_hp_pct - enemy_hp_pct)
+    if unit_hp_pct:
+        columns.append((unit_hp * ally_f).sum(axis=1) / a_n)
+        columns.append((unit_hp * enemy_f).sum(axis=1) / e_n)
+    columns.extend((a_sum[:, _COMP] / a_n[:, None]).T)
+    columns.extend((e_sum[:, _COMP] / e_n[:, None]).T)
+    columns += [
+        a_sum[:, _MOVE_PTS] / a_n,
+        e_sum[:, _MOVE_PTS] / e_n,
+        (n_ally - a_sum[:, _ATTACKED]) / a_n,
+        (n_enemy - e_sum[:, _ATTACKED]) / e_n,
+        *closest.T,
+        ally_density,
+        enemy_density,
+        safe_div(a_terrain[0], a_terrain[1]),
+        safe_div(e_terrain[0], e_terrain[1]),
+        a_terrain[2] / a_n,
+        e_terrain[2] / e_n,
+        acx,
+        acy,
+        ecx,
+        ecy,
+        np.hypot(acx - ecx, acy - ecy),
+        ally_spread.sum(axis=1) / a_n,
+        enemy_spread.sum(axis=1) / e_n,
+        np.where(hit, best_damage, 0.0),
+        np.where(hit, best_target_hp, 0.0),
+        np.where(hit, dist[rows, i, j], max_dim),
+        (hit & (best_damage >= best_target_hp)).astype(np.float64),
     ]
 
-    # ------------------------------------------------------------------
-    # 3. Per-unit tactical / local info
-    # ------------------------------------------------------------------
-    # closest enemy, can I hit, can they hit?
-    def _closest_enemy_info_for_unit(u):
-        if not enemy:
-            return (1.0, 0.0, 0.0, 0.0, 0.0)
-
-        dists = [(_dist(u, e), e) for e in enemy]
-        d, e = min(dists, key=lambda x: x[0])
+    out[:] = np.stack(columns, axis=1)
+    np.multiply(out, _feature_scales(max_dim, unit_hp_pct), out=out)
+    return out
 
-        d_norm = d / max_dim
-        enemy_hp_pct = _safe_div(e["health"], e["max_hp"])
-        enemy_armor_norm = e["armor"] / 100.0
 
-        in_my_range = 1.0 if d <= u["attack_range"] else 0.0
+def encode_state(
+    game_state: dict[str, Any], team_id: int, out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Encode a snapshot into 38 features (30 + composition(8)).
 
-        threatened = 0.0
-        for en in enemy:
-            if _dist(u, en) <= en["attack_range"]:
-                threatened = 1.0
-                break
+    Pass a float32 array of that length as `out` to reuse it between calls;
+    the result is written to and returned as `out` itself, so copy it before
+    the next call if it has to be kept.
+    """
+    return _encode(game_state, team_id, unit_hp_pct=False, out=out)
 
-        return (d_norm, enemy_hp_pct, enemy_armor_norm, in_my_range, threatened)
-
-    if ally:
-        arr = np.array(
-            [_closest_enemy_info_for_unit(u) for u in ally], dtype=np.float32
-        )
-        closest_enemy_info = arr.mean(axis=0)
-    else:
-        closest_enemy_info = np.zeros(5, dtype=np.float32)
 
-    # local ally / enemy density around allies (radius 3)
-    def _nearby_count(u, group, radius: float) -> int:
-        return sum(1 for o in group if o is not u and _dist(u, o) <= radius)
+def encode_state_old(
+    game_state: dict[str, Any], team_id: int, out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Encode a snapshot into 40 features (32 + composition(8)).
 
-    if ally:
-        ally_density = _safe_mean([_nearby_count(a, ally, 3.0) for a in ally])
-        enemy_density = _safe_mean([_nearby_count(a, enemy, 3.0) for a in ally])
-    else:
-        ally_density = 0.0
-        enemy_density = 0.0
+    Pass a float32 array of that length as `out` to reuse it between calls;
+    the result is written to and returned as `out` itself, so copy it before
+    the next call if it has to be kept.
+    """
+    return _encode(game_state, team_id, unit_hp_pct=True, out=out)
 
-    ally_density_norm = ally_density / 10.0
-    enemy_density_norm = enemy_density / 10.0
 
-    # ------------------------------------------------------------------
-    # 4. Terrain influence (using your TILE / TERRAIN_* constants)
-    # ------------------------------------------------------------------
-    def _avg_local_move_cost(group):
-        vals: list[float] = []
-        for u in group:
-            for dy in (-1, 0, 1):
-                for dx in (-1, 0, 1):
-                    x = u["x"] + dx
-                    y = u["y"] + dy
-                    c = _terrain_move_cost(x, y)
-                    if c < 9999:
-                        vals.append(c)
-        return _safe_mean(vals)
-
-    ally_move_cost = _avg_local_move_cost(ally)
-    enemy_move_cost = _avg_local_move_cost(enemy)
-
-    max_move_cost = max(TERRAIN_MOVE_COST.values()) or 1
-    ally_move_cost_norm = ally_move_cost / max_move_cost
-    enemy_move_cost_norm = enemy_move_cost / max_move_cost
-
-    ally_def_bonus = _safe_mean([_terrain_def_bonus(u) for u in ally])
-    enemy_def_bonus = _safe_mean([_terrain_def_bonus(u) for u in enemy])
+def encode_state_batch(
+    snapshots: list[dict[str, Any]], team_id: int, out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    encode_state for a list of snapshots: a (len(snapshots), 38) float32
+    array, written to `out` if given.
+    """
+    return _encode_batch(snapshots, team_id, unit_hp_pct=False, out=out)
 
-    # ------------------------------------------------------------------
-    # 5. Formation / spacing
-    # ------------------------------------------------------------------
-    def _center(group):
-        if not group:
-            return (0.0, 0.0)
-        return (
-            _safe_mean([u["x"] for u in group]) / max_dim,
-            _safe_mean([u["y"] for u in group]) / max_dim,
-        )
-
-    acx, acy = _center(ally)
-    ecx, ecy = _center(enemy)
-
-    center_distance = hypot(acx - ecx, acy - ecy)  # already normalized
-
-    def _dispersion(group, cx, cy):
-        if not group:
-            return 0.0
-        return _safe_mean(
-            [hypot(u["x"] / max_dim - cx, u["y"] / max_dim - cy) for u in group]
-        )
-
-    ally_dispersion = _dispersion(ally, acx, acy)
-    enemy_dispersion = _dispersion(enemy, ecx, ecy)
-
-    # ------------------------------------------------------------------
-    # 6. Best attack opportunity (focus fire / kill shots)
-    # ------------------------------------------------------------------
-    best_damage = 0.0
-    best_target_hp = 0.0
-    best_target_dist = max_dim
-    can_kill = 0.0
-
-    if ally and enemy:
-        for a in ally:
-            for e in enemy:
-                d = _dist(a, e)
-                # rough estimate; you might refine with EFFECTIVENESS
-                estimated = a["attack_power"] - e["armor"] * 0.3
-                if estimated <= 0:
-                    continue
-                if estimated > best_damage:
-                    best_damage = estimated
-                    best_target_hp = float(e["health"])
-                    best_target_dist = d
-                    can_kill = 1.0 if estimated >= e["health"] else 0.0
-
-    best_damage_norm = best_damage / 100.0
-    best_target_hp_norm = best_target_hp / 150.0
-    best_target_dist_norm = best_target_dist / max_dim if max_dim > 0 else 0.0
-
-    # ------------------------------------------------------------------
-    # FINAL FEATURE VECTOR
-    # ------------------------------------------------------------------
-    # 32 features + comp(8)
-    features = [
-        float(team_id),
-        # HP global
-        ally_hp_pct,
-        enemy_hp_pct,
-        hp_advantage,
-        avg_hp_pct_ally,
-        avg_hp_pct_enemy,
-        # Composition
-        *comp,
-        # Mobility & action state
-        avg_move_pts_ally,
-        avg_move_pts_enemy,
-        frac_ally_can_attack,
-        frac_enemy_can_attack,
-        # Closest enemy tactical info (averaged over allies)
-        closest_enemy_info[0],  # avg distance to closest enemy (normalized)
-        closest_enemy_info[1],  # avg closest enemy HP%
-        closest_enemy_info[2],  # avg closest enemy armor
-        closest_enemy_info[3],  # fraction of allies that have someone in range
-        closest_enemy_info[4],  # fraction threatened by enemy in range
-        # Local densities
-        ally_density_norm,
-        enemy_density_norm,
-        # Terrain context
-        ally_move_cost_norm,
-        enemy_move_cost_norm,
-        ally_def_bonus,
-        enemy_def_bonus,
-        # Formation
-        acx,
-        acy,
-        ecx,
-        ecy,
-        center_distance,
-        ally_dispersion,
-        enemy_dispersion,
-        # Best attack opportunity
-        best_damage_norm,
-        best_target_hp_norm,
-        best_target_dist_norm,
-        can_kill,
-    ]
 
-    return np.array(features, dtype=np.float32)
+def encode_state_old_batch(
+    snapshots: list[dict[str, Any]], team_id: int, out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    encode_state_old for a list of snapshots: a (len(snapshots), 40) float32
+    array, written to `out` if given.
+    """
+    return _encode_batch(snapshots, team_id, unit_hp_pct=True, out=out)
 
 
 def encode_state1(game_state: dict[str, Any], team_id: int) -> np.ndarray:
@@ -541,11 +578,11 @@ def encode_state1(game_state: dict[str, Any], team_id: int) -> np.ndarray:
     enemy_hp_ratio = enemy_hp / total_hp
 
     # HP distribution
-    ally_hp_mean = np.mean([u["health"] for u in ally])
-    enemy_hp_mean = np.mean([u["health"] for u in enemy])
+    ally_hp_mean = _mean([u["health"] for u in ally])
+    enemy_hp_mean = _mean([u["health"] for u in enemy])
 
-    ally_hp_pct_mean = np.mean([u["health"] / u["max_hp"] for u in ally])
-    enemy_hp_pct_mean = np.mean([u["health"] / u["max_hp"] for u in enemy])
+    ally_hp_pct_mean = _mean([u["health"] / u["max_hp"] for u in ally])
+    enemy_hp_pct_mean = _mean([u["health"] / u["max_hp"] for u in enemy])
 
     # ---------------------------
     # Composition (counts by type)
@@ -569,11 +606,11 @@ def encode_state1(game_state: dict[str, Any], team_id: int) -> np.ndarray:
     ally_attack = sum(u["attack_power"] for u in ally)
     enemy_attack = sum(u["attack_power"] for u in enemy)
 
-    ally_range_avg = np.mean([u["attack_range"] for u in ally])
-    enemy_range_avg = np.mean([u["attack_range"] for u in enemy])
+    ally_range_avg = _mean([u["attack_range"] for u in ally])
+    enemy_range_avg = _mean([u["attack_range"] for u in enemy])
 
-    ally_armor_avg = np.mean([u["armor"] for u in ally])
-    enemy_armor_avg = np.mean([u["armor"] for u in enemy])
+    ally_armor_avg = _mean([u["armor"] for u in ally])
+    enemy_armor_avg = _mean([u["armor"] for u in enemy])
 
     # ---------------------------
     # Mobility
@@ -588,18 +625,18 @@ def encode_state1(game_state: dict[str, Any], team_id: int) -> np.ndarray:
         if not us:
             return (0.0, 0.0)
         return (
-            float(np.mean([u["x"] for u in us])),
-            float(np.mean([u["y"] for u in us])),
+            _mean([u["x"] for u in us]),
+            _mean([u["y"] for u in us]),
         )
 
     ax, ay = avg_xy(ally)
     ex, ey = avg_xy(enemy)
 
-    dist_centers = float(np.hypot(ax - ex, ay - ey))
+    dist_centers = hypot(ax - ex, ay - ey)
 
     # Spread = average distance from center of mass
     def avg_spread(us, cx, cy):
-        return np.mean([float(np.hypot(u["x"] - cx, u["y"] - cy)) for u in us])
+        return _mean([hypot(u["x"] - cx, u["y"] - cy) for u in us])
 
     ally_spread = avg_spread(ally, ax, ay)
     enemy_spread = avg_spread(enemy, ex, ey)
@@ -607,8 +644,8 @@ def encode_state1(game_state: dict[str, Any], team_id: int) -> np.ndarray:
     # ---------------------------
     # Tactical status
     # ---------------------------
-    frac_ally_can_attack = np.mean([0 if u["has_attacked"] else 1 for u in ally])
-    frac_enemy_can_attack = np.mean([0 if u["has_attacked"] else 1 for u in enemy])
+    frac_ally_can_attack = _mean([0 if u["has_attacked"] else 1 for u in ally])
+    frac_enemy_can_attack = _mean([0 if u["has_attacked"] else 1 for u in enemy])
 
     # ---------------------------
     # Threat: % of allies in range of an enemy (and vice versa)
@@ -619,13 +656,13 @@ def encode_state1(game_state: dict[str, Any], team_id: int) -> np.ndarray:
         ]
 
     ally_threatened = (
-        np.mean([1 if any(in_attack_range(e, a) for e in enemy) else 0 for a in ally])
+        _mean([1 if any(in_attack_range(e, a) for e in enemy) else 0 for a in ally])
         if ally
         else 0.0
     )
 
     enemy_threatened = (
-        np.mean([1 if any(in_attack_range(a, e) for a in ally) else 0 for e in enemy])
+        _mean([1 if any(in_attack_range(a, e) for a in ally) else 0 for e in enemy])
         if enemy
         else 0.0
     )
@@ -643,8 +680,8 @@ def encode_state1(game_state: dict[str, Any], team_id: int) -> np.ndarray:
             return -0.5
         return 0.0
 
-    ally_terrain = np.mean([terrain_value(u) for u in ally])
-    enemy_terrain = np.mean([terrain_value(u) for u in enemy])
+    ally_terrain = _mean([terrain_value(u) for u in ally])
+    enemy_terrain = _mean([terrain_value(u) for u in enemy])
 
     # ---------------------------
     # Final vector (normalize everything)
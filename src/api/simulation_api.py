@@ -18,9 +18,17 @@ class SimulationAPI(GameAPI):
             agent=None,
         )
 
-    def clone(self):
-        new_board = self.game_board.fast_clone()
-        return SimulationAPI(new_board)
+    def clone(self, game_board: GameState | None = None):
+        """
+        Independent copy of this simulation (see GameState.fast_clone()).
+
+        Pass `game_board` to start the copy on that board instead: nothing
+        is copied then, which is what match setup wants when it replaces
+        the board anyway.
+        """
+        if game_board is None:
+            game_board = self.game_board.fast_clone()
+        return SimulationAPI(game_board)
 
     @staticmethod
     def from_snapshot(snapshot: dict) -> "SimulationAPI":
@@ -51,7 +51,20 @@ class GameState:
     }
 
     def fast_clone(self) -> "GameState":
-        return copy.deepcopy(self)
+        """
+        Cheap copy for AI simulations.
+
+        Units are copied one level deep with Unit.clone() (they only hold
+        scalar fields). The tile map is shared, since nothing mutates it after
+        map generation.
+        """
+        return GameState(
+            width=self.width,
+            height=self.height,
+            cell_size=self.cell_size,
+            tile_map=self.tile_map,
+            units=[u.clone() for u in self.units],
+        )
 
     def clone(self):
         return copy.deepcopy(self)
@@ -1,15 +1,34 @@
 from __future__ import annotations
 
 import copy
+from dataclasses import dataclass, field
 from typing import Optional
 
 from backend.board import GameState, TileType
 from backend.units import Unit
-from utils.constants import DAMAGE_DISPLAY_TIME, DIRS, EPSILON
+from utils.constants import DAMAGE_DISPLAY_TIME, DIRS, EPSILON, TERRAIN_MOVE_COST
 from utils.helpers import calculate_damage, compute_min_cost_gs, manhattan
 from utils.logging import logger
 
 
+@dataclass(slots=True)
+class UndoRecord:
+    """
+    Fields mutated by a single GameLogic.apply_action_with_undo() call.
+
+    Records can be recycled once undone (see apply_action_with_undo()).
+
+    Attributes:
+        unit_states (list[tuple[Unit, tuple]]): Touched units with their
+            per-turn state from before the action.
+        units (Optional[list[Unit]]): Previous unit list object, kept only
+            for attacks because remove_dead() may replace the board's list.
+    """
+
+    unit_states: list[tuple[Unit, tuple]] = field(default_factory=list)
+    units: Optional[list[Unit]] = None
+
+
 class GameLogic:
     """
     Core backend logic for game mechanics.
@@ -22,15 +41,18 @@ class GameLogic:
     - Running the AI’s decision loop
     """
 
-    def __init__(self, game_state: GameState) -> None:
+    def __init__(self, game_state: GameState, log_actions: bool = True) -> None:
         """
         Initialize the game logic controller.
 
         Args:
             game_state (GameState): The shared game state containing tiles and units.
+            log_actions (bool): Log moves and attacks. Search simulations turn
+                this off so hypothetical actions skip message formatting.
         """
         self.game_board = game_state
         self.dirs = DIRS
+        self.log_actions = log_actions
 
     def clone(self):
         return copy.deepcopy(self)
@@ -84,10 +106,11 @@ class GameLogic:
 
     def move_unit(self, unit: Unit, to_x: int, to_y: int) -> bool:
         if not self.can_move(unit, to_x, to_y):
-            logger.info(
-                f"""{unit.name} (ID:{unit.id}) unit of
-                team:{unit.team} cannot move there [{to_x};{to_y}]."""
-            )
+            if self.log_actions:
+                logger.info(
+                    f"""{unit.name} (ID:{unit.id}) unit of
+                    team:{unit.team} cannot move there [{to_x};{to_y}]."""
+                )
             return False
 
         # Same cost logic as in can_move
@@ -104,10 +127,11 @@ class GameLogic:
         if unit.move_points <= EPSILON:
             unit.has_acted = True
 
-        logger.info(
-            f"""{unit.name} (ID:{unit.id}) unit of team:{unit.team}
-            moved to ({to_x},{to_y}), points left: {unit.move_points}."""
-        )
+        if self.log_actions:
+            logger.info(
+                f"""{unit.name} (ID:{unit.id}) unit of team:{unit.team}
+                moved to ({to_x},{to_y}), points left: {unit.move_points}."""
+            )
         return True
 
     def get_attackable_tiles(self, unit: Unit) -> list[tuple[int, int]]:
@@ -168,27 +192,30 @@ class GameLogic:
         if attacker.attack_range > 1:
             # Ranged attack — no retaliation
             defender.health -= dmg
-            logger.info(
-                f"""{attacker.name} (ID:{attacker.id}) unit of team:{attacker.team}
-                shot {defender.name} (ID:{defender.id}) unit of team:{defender.team}
-                for {dmg}."""
-            )
+            if self.log_actions:
+                logger.info(
+                    f"""{attacker.name} (ID:{attacker.id}) unit of team:{attacker.team}
+                    shot {defender.name} (ID:{defender.id}) unit of team:{defender.team}
+                    for {dmg}."""
+                )
         else:
             # Melee — defender can retaliate if still alive
             defender.health -= dmg
-            logger.info(
-                f"""{attacker.name} (ID:{attacker.id}) unit of team:{attacker.team}
-                hit {defender.name} (ID:{defender.id}) unit of team:{defender.team}
-                for {dmg}."""
-            )
+            if self.log_actions:
+                logger.info(
+                    f"""{attacker.name} (ID:{attacker.id}) unit of team:{attacker.team}
+                    hit {defender.name} (ID:{defender.id}) unit of team:{defender.team}
+                    for {dmg}."""
+                )
             if defender.health > 0:
                 retaliation = calculate_damage(defender, attacker)
                 attacker.health -= retaliation
                 if retaliation > 0:
-                    logger.info(
-                        f"""{defender.name} (ID:{defender.id}) unit of
-                           team:{defender.team} retaliated for {retaliation}."""
-                    )
+                    if self.log_actions:
+                        logger.info(
+                            f"""{defender.name} (ID:{defender.id}) unit of
+                               team:{defender.team} retaliated for {retaliation}."""
+                        )
 
         # --- Finalize attack ---
         attacker.has_attacked = True
@@ -197,37 +224,68 @@ class GameLogic:
         return True
 
     def get_legal_actions(self, team_id) -> list[dict]:
-        actions = []
-        units = [
-            u
-            for u in self.game_board.units
-            if u.team_id == team_id and not u.has_acted and u.move_points > EPSILON
+        """
+        All actions available to `team_id`: per unit its single-step moves,
+        then its attacks, then a wait.
+
+        Same results as combining get_movable_tiles() and
+        get_attackable_tiles(), but unit positions are indexed once per call
+        instead of scanning the unit list for every candidate tile.
+        """
+        board = self.game_board
+        all_units = board.units
+        occupied = {(u.x, u.y): u for u in reversed(all_units)}
+        tile_map = board.tile_map
+        width, height = board.width, board.height
+        # (x, y, id of the unit attacked there) per enemy, resolved once
+        # instead of once per acting unit
+        enemy_cells = [
+            (t.x, t.y, occupied[(t.x, t.y)].id)
+            for t in all_units
+            if t.team_id != team_id
         ]
 
-        for unit in units:
-            # Moves
-            movable_tiles = self.get_movable_tiles(unit)
-            for x, y in movable_tiles:
-                actions.append({"unit_id": unit.id, "type": "move", "target": (x, y)})
+        actions = []
+        for unit in all_units:
+            if unit.team_id != team_id or unit.has_acted:
+                continue
+            if unit.move_points <= EPSILON:
+                continue
+            uid = unit.id
+            ux, uy = unit.x, unit.y
+
+            # Moves (no moving after an attack)
+            if not unit.has_attacked:
+                for dx, dy in self.dirs:
+                    nx = ux + dx
+                    ny = uy + dy
+                    if not (0 <= nx < width and 0 <= ny < height):
+                        continue
+                    if (nx, ny) in occupied:
+                        continue
+                    terrain = tile_map[ny][nx]
+                    if terrain == TileType.MOUNTAIN:
+                        continue
+                    if TERRAIN_MOVE_COST[terrain] <= unit.move_points:
+                        actions.append(
+                            {"unit_id": uid, "type": "move", "target": (nx, ny)}
+                        )
 
             # Attacks
-            attackable_tiles = self.get_attackable_tiles(unit)
-            for x, y in attackable_tiles:
-                defender = self.game_board.get_unit_at(x, y)
-                if defender:
+            reach = max(1, unit.attack_range)
+            for tx, ty, defender_id in enemy_cells:
+                if abs(ux - tx) + abs(uy - ty) <= reach:
                     actions.append(
-                        {"unit_id": unit.id, "type": "attack", "target": defender.id}
+                        {"unit_id": uid, "type": "attack", "target": defender_id}
                     )
 
             # Always allow wait/pass (finish action)
-            actions.append({"unit_id": unit.id, "type": "wait", "target": None})
+            actions.append({"unit_id": uid, "type": "wait", "target": None})
 
         return actions
 
     def apply_action(self, action: dict):
-        unit = next(
-            (u for u in self.game_board.units if u.id == action["unit_id"]), None
-        )
+        unit = self.game_board.get_unit_by_id(action["unit_id"])
         if not unit:
             return False
 
@@ -236,10 +294,7 @@ class GameLogic:
             return self.move_unit(unit, x, y)
 
         elif action["type"] == "attack":
-            target_id = action["target"]
-            target_unit = next(
-                (u for u in self.game_board.units if u.id == target_id), None
-            )
+            target_unit = self.game_board.get_unit_by_id(action["target"])
             if target_unit:
                 return self.apply_attack(unit, target_unit)
             return False
@@ -250,6 +305,86 @@ class GameLogic:
 
         return False
 
+    # ------------------------------
+    # Reversible Actions (AI search)
+    # ------------------------------
+
+    @staticmethod
+    def unit_state(unit: Unit) -> tuple:
+        return (
+            unit.x,
+            unit.y,
+            unit.health,
+            unit.move_points,
+            unit.has_attacked,
+            unit.has_acted,
+            unit.last_damage,
+            unit.damage_timer,
+        )
+
+    def apply_action_with_undo(
+        self, action: dict, record: Optional[UndoRecord] = None
+    ) -> Optional[UndoRecord]:
+        """
+        Apply an action in place, recording only the fields it mutates.
+
+        Lets search code walk a tree on one board (apply, recurse, undo)
+        instead of cloning the whole GameState per node.
+
+        Args:
+            action (dict): Action as returned by get_legal_actions().
+            record (Optional[UndoRecord]): Spent record to refill instead of
+                allocating a new one.
+
+        Returns:
+            Optional[UndoRecord]: Record to pass to undo(), or None if the
+            action was rejected (the board is left untouched).
+        """
+        unit = self.game_board.get_unit_by_id(action["unit_id"])
+        if unit is None:
+            return None
+
+        if record is None:
+            record = UndoRecord()
+        else:
+            record.unit_states.clear()
+            record.units = None
+        record.unit_states.append((unit, self.unit_state(unit)))
+
+        if action["type"] == "attack":
+            target = self.game_board.get_unit_by_id(action["target"])
+            if target is None:
+                return None
+            record.unit_states.append((target, self.unit_state(target)))
+            # remove_dead() rebinds board.units to a new list instead of
+            # editing it, so keeping the current list object is enough
+            record.units = self.game_board.units
+
+        if not self.apply_action(action):
+            return None
+        return record
+
+    def undo(self, record: UndoRecord) -> None:
+        """
+        Revert an action applied with apply_action_with_undo().
+
+        Records must be undone in reverse order of application.
+        """
+        for unit, state in reversed(record.unit_states):
+            (
+                unit.x,
+                unit.y,
+                unit.health,
+                unit.move_points,
+                unit.has_attacked,
+                unit.has_acted,
+                unit.last_damage,
+                unit.damage_timer,
+            ) = state
+
+        if record.units is not None:
+            self.game_board.units = record.units
+
     def update_damage_timers(self) -> None:
         """
         Update and decrease the damage text timers for all units.
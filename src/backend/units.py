@@ -1,5 +1,4 @@
 # backend/units.py
-import copy
 from abc import ABC
 
 from utils.constants import UNIT_STATS, TeamType, UnitType
@@ -45,9 +44,19 @@ class Unit(ABC):
         self.last_damage = 0
         self.damage_timer = 0
 
+    def clone(self) -> "Unit":
+        """
+        Copy for AI simulations. Every attribute is a scalar, str or enum, so
+        a copy of __dict__ is a full copy; it skips the __reduce_ex__ round
+        trip that copy.copy() / copy.deepcopy() go through.
+        """
+        new = object.__new__(self.__class__)
+        new.__dict__ = self.__dict__.copy()
+        return new
+
     def clone_minimal(self):
-        # For now, just deep-copy this unit so IDs, HP, flags etc. match.
-        return copy.deepcopy(self)
+        # Same IDs, HP, flags etc. as this unit
+        return self.clone()
 
 
 class Swordsman(Unit):
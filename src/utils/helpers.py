@@ -1,6 +1,9 @@
 # utils/helpers.py
 import heapq
 import math
+import os
+import random
+import time
 from typing import Any, Optional
 
 from utils.constants import (
@@ -22,6 +25,30 @@ def manhattan(x1: int, y1: int, x2: int, y2: int) -> int:
     return abs(x1 - x2) + abs(y1 - y2)
 
 
+def reseed_random() -> None:
+    """
+    Reseed `random` from the pid and the clock; forked pool workers would
+    otherwise all replay the parent's (identical) random stream.
+    """
+    random.seed((os.getpid() << 32) ^ time.time_ns())
+
+
+def team_hp_and_alive(units) -> tuple[int, int, int, int]:
+    """
+    (hp1, hp2, alive1, alive2) for teams 1 and 2, in one pass over a
+    board's unit list (no snapshot needed).
+    """
+    hp1 = hp2 = alive1 = alive2 = 0
+    for u in units:
+        if u.team_id == 1:
+            hp1 += u.health
+            alive1 += 1
+        elif u.team_id == 2:
+            hp2 += u.health
+            alive2 += 1
+    return hp1, hp2, alive1, alive2
+
+
 def compute_min_cost_gs(gs, start: tuple[int, int], goal: tuple[int, int]) -> float:
     """
     Dijkstra / uniform-cost search on GameState 'gs' returning minimal movement cost
@@ -38,9 +65,17 @@ def compute_min_cost_gs(gs, start: tuple[int, int], goal: tuple[int, int]) -> fl
 
     INF = 10**9  # effectively "infinity" for unreachable paths
 
+    tiles = gs.tile_map
+    width, height = gs.width, gs.height
+    mountain = TileType.MOUNTAIN
+
+    # Tiles blocked by another unit, indexed once instead of scanning the
+    # unit list for every neighbour. The target tile is never blocked.
+    occupied = {(u.x, u.y) for u in gs.units}
+    occupied.discard((tx, ty))
+
     # Priority queue for Dijkstra: stores (cost_so_far, x, y)
-    pq: list[tuple[float, int, int]] = []
-    heapq.heappush(pq, (0.0, sx, sy))
+    pq: list[tuple[float, int, int]] = [(0.0, sx, sy)]
 
     # Dictionary to remember the best known cost to reach each tile
     best: dict[tuple[int, int], float] = {(sx, sy): 0.0}
@@ -50,11 +85,11 @@ def compute_min_cost_gs(gs, start: tuple[int, int], goal: tuple[int, int]) -> fl
         cost, x, y = heapq.heappop(pq)
 
         # If we've reached the target → return the total cost
-        if (x, y) == (tx, ty):
+        if x == tx and y == ty:
             return cost
 
         # Skip if this is not the best cost anymore (outdated entry in the PQ)
-        if cost != best.get((x, y), INF):
+        if cost != best[(x, y)]:
             continue
 
         # Explore all 8 possible movement directions (DIRS must include diagonals)
@@ -62,20 +97,21 @@ def compute_min_cost_gs(gs, start: tuple[int, int], goal: tuple[int, int]) -> fl
             nx, ny = x + dx, y + dy
 
             # Ignore moves outside map boundaries
-            if not gs.in_bounds(nx, ny):
+            if not (0 <= nx < width and 0 <= ny < height):
                 continue
 
             # Mountains are impassable
-            if gs.tile(nx, ny) == TileType.MOUNTAIN:
+            terrain = tiles[ny][nx]
+            if terrain == mountain:
                 continue
 
-            # Blocked if another unit is there, unless it's the target tile
-            occupant = gs.get_unit_at(nx, ny)
-            if occupant is not None and (nx, ny) != (tx, ty):
+            # Blocked if another unit is there
+            pos = (nx, ny)
+            if pos in occupied:
                 continue
 
             # Base movement cost depends on the terrain type of the target tile
-            step_cost = gs.move_cost(nx, ny)
+            step_cost = TERRAIN_MOVE_COST[terrain]
 
             # TODO: refactor the if condition
             # If moving diagonally, apply sqrt(2) multiplier
@@ -86,8 +122,8 @@ def compute_min_cost_gs(gs, start: tuple[int, int], goal: tuple[int, int]) -> fl
             nc = cost + step_cost
 
             # Only update if this path is cheaper than any previously found
-            if nc < best.get((nx, ny), INF):
-                best[(nx, ny)] = nc
+            if nc < best.get(pos, INF):
+                best[pos] = nc
                 heapq.heappush(pq, (nc, nx, ny))
 
     # If we exhaust the search without reaching the goal → unreachable
@@ -151,15 +187,20 @@ def movement_cost_snapshot(
 
 
 def next_step_toward_snapshot(
-    snapshot: dict[str, Any], start: tuple[int, int], goal: tuple[int, int]
+    snapshot: dict[str, Any],
+    start: tuple[int, int],
+    goal: tuple[int, int],
+    occupied: Optional[set[tuple[int, int]]] = None,
 ) -> Optional[tuple[int, int]]:
     """
     Compute the first step on a shortest-cost path from start to goal using snapshot.
     Returns (nx,ny) or None if unreachable or already at goal.
     Diagonal steps cost sqrt(2) * terrain cost.
+
+    `occupied` lets callers that already collected the snapshot's unit
+    positions pass them in (it is not modified).
     """
     tiles: list[list[TileType]] = snapshot["tiles"]
-    units: list[dict[str, Any]] = snapshot["units"]
     W = len(tiles[0])
     H = len(tiles)
 
@@ -168,50 +209,45 @@ def next_step_toward_snapshot(
     if (sx, sy) == (tx, ty):
         return None
 
-    def in_bounds(x: int, y: int) -> bool:
-        return 0 <= x < W and 0 <= y < H
-
-    def tile_at(x: int, y: int) -> TileType:
-        return tiles[y][x]
-
-    occupied = {(u["x"], u["y"]) for u in units}
+    if occupied is None:
+        occupied = {(u["x"], u["y"]) for u in snapshot["units"]}
+    # The goal tile may be entered even when a unit stands on it
+    occupied = occupied - {(tx, ty)}
 
+    mountain = TileType.MOUNTAIN
     INF = 10**9
-    pq: list[tuple[float, int, int]] = []
-    heapq.heappush(pq, (0.0, sx, sy))
+    pq: list[tuple[float, int, int]] = [(0.0, sx, sy)]
     best: dict[tuple[int, int], float] = {(sx, sy): 0.0}
-    parent: dict[tuple[int, int], tuple[int, int]] = {}
+    # First step of the best known path to each tile; only that step is
+    # returned, so the path itself is never rebuilt.
+    first: dict[tuple[int, int], tuple[int, int]] = {}
 
     while pq:
         cost, x, y = heapq.heappop(pq)
-        if (x, y) == (tx, ty):
-            # reconstruct path
-            cur = (tx, ty)
-            path = []
-            while cur != (sx, sy):
-                path.append(cur)
-                cur = parent[cur]
-            path.reverse()
-            return path[0] if path else None
-        if cost != best.get((x, y), INF):
+        if x == tx and y == ty:
+            return first[(tx, ty)]
+        if cost != best[(x, y)]:
             continue
+        step = first.get((x, y))
         for dx, dy in DIRS:
             nx, ny = x + dx, y + dy
-            if not in_bounds(nx, ny):
+            if not (0 <= nx < W and 0 <= ny < H):
                 continue
-            if tile_at(nx, ny) == TileType.MOUNTAIN:
+            terrain = tiles[ny][nx]
+            if terrain == mountain:
                 continue
-            if (nx, ny) in occupied and (nx, ny) != (tx, ty):
+            pos = (nx, ny)
+            if pos in occupied:
                 continue
 
-            step_cost = TERRAIN_MOVE_COST[tile_at(nx, ny)]
+            step_cost = TERRAIN_MOVE_COST[terrain]
             if dx != 0 and dy != 0:  # diagonal
                 step_cost *= math.sqrt(2)
 
             nc = cost + step_cost
-            if nc < best.get((nx, ny), INF):
-                best[(nx, ny)] = nc
-                parent[(nx, ny)] = (x, y)
+            if nc < best.get(pos, INF):
+                best[pos] = nc
+                first[pos] = step or pos
                 heapq.heappush(pq, (nc, nx, ny))
 
     return None